@@ -0,0 +1,335 @@
+"""
+Нагрузочные замеры на одной машине без сети.
+
+    python bench.py -o bench.json
+    python bench.py --sizes 1000 10000 --baseline bench.json
+
+Хосты берутся из 127.0.0.0/8. Каждый сценарий выполняется в отдельном
+процессе, чтобы замер памяти не зависел от предыдущих сценариев:
+- loopback — настоящий опрос через ProbeEngine (нужен доступ к ICMP:
+  ping_group_range или --privileged);
+- simulated — имитация медленного и теряющего пакеты ответчика: вместо
+  отправки ICMP проверка ждет заданное RTT, часть ответов теряется.
+
+Для каждого сценария в JSON пишутся: проверки в секунду, задержка
+планирования относительно назначенного времени, время обработки пачки
+результатов моделью таблицы (apply_results, как в update_metrics),
+время импорта CSV, прирост резидентной памяти на хост и (с --bulk)
+накладные расходы измерения RTT. С --baseline результаты сравниваются
+с прошлым прогоном; ухудшение больше --tolerance дает код возврата 1.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from host_import import expand_hosts, iter_csv_targets
+from metrics import rss_bytes
+from probe_engine import ProbeEngine, ProbeResult, burst_result
+from scheduler import ProbeScheduler
+
+DEFAULT_SIZES = (1000, 10000, 50000)
+# Период пачек результатов для модели таблицы, как UI_TICK_MS в main.py
+BATCH_SECONDS = 0.2
+
+# Метрики, для которых больше — лучше; остальные сравниваются как «меньше — лучше»
+HIGHER_IS_BETTER = {"probes_per_second"}
+
+
+class LagScheduler(ProbeScheduler):
+    """Планировщик, запоминающий опоздание и длительность каждой проверки"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lags = []
+        self.durations = []
+        self._started = {}
+
+    def pop_due(self, now, limit=None):
+        due = super().pop_due(now, limit)
+        self.lags.extend(now - entry.due for entry in due)
+        self._started.update((entry.host, now) for entry in due)
+        return due
+
+    def complete(self, host, alive, now):
+        started = self._started.pop(host, None)
+        if started is not None:
+            self.durations.append(now - started)
+        super().complete(host, alive, now)
+
+
+class SimulatedEngine(ProbeEngine):
+    """Движок с имитацией ответчика: RTT около rtt мс, доля loss ответов теряется"""
+
+    def __init__(self, *args, rtt: float = 50.0, loss: float = 0.1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rtt = rtt
+        self.loss = loss
+
+    async def _probe(self, host: str, address: str) -> ProbeResult:
+        # Серия длится до последнего ответа или таймаута последнего потерянного пакета
+        rtts, finish = [], 0.0
+        for number in range(self.count):
+            sent = number * self.burst_interval
+            if random.random() < self.loss:
+                finish = max(finish, sent + self.timeout)
+                continue
+            rtt = self.rtt * random.uniform(0.5, 1.5)
+            rtts.append(rtt)
+            finish = max(finish, sent + rtt / 1000)
+        await asyncio.sleep(finish)
+        return burst_result(host, self.count, rtts)
+
+
+def loopback_hosts(count: int):
+    base = 0x7F000001  # 127.0.0.1
+    return [f"127.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}" for n in range(base, base + count)]
+
+
+def percentiles(values, points=(50, 99)):
+    if not values:
+        return {f"p{p}": None for p in points} | {"max": None}
+    ordered = sorted(values)
+    result = {f"p{p}": ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] for p in points}
+    result["max"] = ordered[-1]
+    return result
+
+
+def rounded(stats: dict, scale: float = 1.0, digits: int = 3) -> dict:
+    return {key: None if value is None else round(value * scale, digits) for key, value in stats.items()}
+
+
+def bench_import(hosts) -> float:
+    """Время чтения CSV в формате экспорта с разворачиванием и отсевом повторов, с"""
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8-sig") as f:
+        f.write("Хост;RTT\n")
+        f.writelines(f"{host};\n" for host in hosts)
+        name = f.name
+    try:
+        started = time.perf_counter()
+        count = sum(1 for _ in expand_hosts(iter_csv_targets(name)))
+        elapsed = time.perf_counter() - started
+    finally:
+        os.unlink(name)
+    assert count == len(hosts)
+    return elapsed
+
+
+def run_scenario(mode: str, size: int, options: dict) -> dict:
+    """Один сценарий; выполняется в отдельном процессе"""
+    hosts = loopback_hosts(size)
+    record = {"mode": mode, "hosts": size, "interval": options["interval"], "count": options["count"]}
+    record["csv_import_ms"] = round(bench_import(hosts) * 1000, 1)
+
+    # Память: модель таблицы со статистикой и планировщик на size хостов
+    from PyQt6.QtCore import QCoreApplication
+
+    from host_model import HostTableModel
+    from host_stats import DEFAULT_WINDOWS, HostStats, raw_samples_for
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    rss_before = rss_bytes()
+    model = HostTableModel(stats=HostStats(raw_samples_for(DEFAULT_WINDOWS[0], options["interval"], options["count"])))
+    model.add_hosts(hosts)
+    scheduler = LagScheduler(interval=options["interval"], max_backoff=options["interval"])
+    scheduler.add_many(hosts, time.monotonic())
+    record["rss_per_host_bytes"] = round((rss_bytes() - rss_before) / size, 1)
+
+    results = []
+    lock = threading.Lock()
+
+    def on_result(result):
+        with lock:
+            results.append(result)
+
+    engine_options = dict(
+        on_result=on_result,
+        concurrency=options["concurrency"],
+        timeout=options["timeout"],
+        privileged=options["privileged"],
+        scheduler=scheduler,
+        bulk=options["bulk"],
+        count=options["count"],
+        burst_interval=options["burst_interval"],
+    )
+    if mode == "simulated":
+        # Имитация не использует сокет
+        engine_options["bulk"] = False
+        engine = SimulatedEngine(rtt=options["sim_rtt"], loss=options["sim_loss"], **engine_options)
+    else:
+        engine = ProbeEngine(**engine_options)
+
+    engine.start(hosts)
+    time.sleep(options["duration"])
+    engine.stop()
+    with lock:
+        results = list(results)
+
+    record["probes_per_second"] = round(len(results) / options["duration"], 1)
+    record["expected_per_second"] = round(size / options["interval"], 1)
+    record["alive_ratio"] = round(sum(r.is_alive for r in results) / len(results), 3) if results else 0.0
+    errors = {r.error for r in results if r.packets_sent == 0 and r.error}
+    if errors:
+        record["errors"] = sorted(errors)[:3]
+    record["schedule_lag_ms"] = rounded(percentiles(scheduler.lags), 1000)
+    record["probe_duration_ms"] = rounded(percentiles(scheduler.durations), 1000)
+    overheads = [r.overhead for r in results if r.overhead is not None]
+    if overheads:
+        record["measurement_overhead_ms"] = rounded(percentiles(overheads))
+
+    # Отложенные события модели не должны попасть в замер update_metrics
+    app.processEvents()
+
+    # Пачки результатов в том виде, в каком их получает update_metrics
+    batches = {}
+    for result in results:
+        batches.setdefault(int(result.timestamp / BATCH_SECONDS), []).append(result)
+    timings = []
+    for key in sorted(batches):
+        started = time.perf_counter()
+        model.apply_results(batches[key])
+        timings.append(time.perf_counter() - started)
+    record["update_metrics_ms"] = rounded(percentiles(timings), 1000)
+    record["update_metrics_batch"] = round(len(results) / len(batches), 1) if batches else 0
+
+    started = time.perf_counter()
+    model.refresh_stats()
+    record["refresh_stats_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return record
+
+
+def _scenario_process(mode, size, options, output):
+    try:
+        output.put(run_scenario(mode, size, options))
+    except Exception as e:
+        output.put({"mode": mode, "hosts": size, "error": f"{type(e).__name__}: {e}"})
+
+
+def run_isolated(mode: str, size: int, options: dict) -> dict:
+    context = multiprocessing.get_context("spawn")
+    output = context.Queue()
+    process = context.Process(target=_scenario_process, args=(mode, size, options, output))
+    process.start()
+    record = output.get()
+    process.join()
+    return record
+
+
+def compare(results, baseline, tolerance: float):
+    """Сравнение с прошлым прогоном; возвращает список ухудшений"""
+    previous = {(r["mode"], r["hosts"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for record in results:
+        old = previous.get((record["mode"], record["hosts"]))
+        if old is None:
+            continue
+        for name, value, old_value in _metric_pairs(record, old):
+            if not old_value:
+                continue
+            change = (value - old_value) / old_value
+            worse = -change if name in HIGHER_IS_BETTER else change
+            if worse > tolerance:
+                regressions.append(f"{record['mode']}/{record['hosts']} {name}: {old_value} → {value}")
+    return regressions
+
+
+def _metric_pairs(record, old):
+    for name in ("probes_per_second", "csv_import_ms", "rss_per_host_bytes", "refresh_stats_ms"):
+        if record.get(name) is not None and old.get(name) is not None:
+            yield name, record[name], old[name]
+    for group in ("schedule_lag_ms", "update_metrics_ms"):
+        value, old_value = record.get(group, {}).get("p99"), old.get(group, {}).get("p99")
+        if value is not None and old_value is not None:
+            yield f"{group}.p99", value, old_value
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочные замеры опроса на 127.0.0.0/8")
+    parser.add_argument("-o", "--output", default="-", help="файл JSON с результатами, '-' — stdout")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="число хостов")
+    parser.add_argument("--modes", nargs="+", choices=("loopback", "simulated"),
+                        default=["loopback", "simulated"], help="сценарии")
+    parser.add_argument("--duration", type=float, default=10.0, help="время опроса в сценарии, с")
+    parser.add_argument("--interval", type=float, default=1.0, help="интервал опроса хоста, с")
+    parser.add_argument("--timeout", type=float, default=1.0, help="таймаут ответа, с")
+    parser.add_argument("--concurrency", type=int, default=10000, help="максимум одновременных проверок")
+    parser.add_argument("--privileged", action="store_true", help="использовать raw-сокеты")
+    parser.add_argument("--bulk", action="store_true", help="опрос через один общий ICMP-сокет")
+    parser.add_argument("--count", type=int, default=1, help="пакетов в серии на каждую проверку")
+    parser.add_argument("--burst-interval", type=float, default=0.2, help="промежуток между пакетами серии, с")
+    parser.add_argument("--sim-rtt", type=float, default=50.0, help="RTT имитации, мс")
+    parser.add_argument("--sim-loss", type=float, default=0.1, help="доля потерь имитации")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение (0.2 — 20%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    options = {
+        "duration": args.duration,
+        "interval": args.interval,
+        "timeout": args.timeout,
+        "concurrency": args.concurrency,
+        "privileged": args.privileged,
+        "bulk": args.bulk,
+        "count": args.count,
+        "burst_interval": args.burst_interval,
+        "sim_rtt": args.sim_rtt,
+        "sim_loss": args.sim_loss,
+    }
+
+    results = []
+    for mode in args.modes:
+        for size in args.sizes:
+            print(f"{mode}: {size} хостов...", file=sys.stderr)
+            record = run_isolated(mode, size, options)
+            print(f"  {json.dumps(record, ensure_ascii=False)}", file=sys.stderr)
+            results.append(record)
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": round(time.time()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "options": options,
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"Ухудшение: {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,670 @@
+"""
+Распределенный опрос: исполнители на нескольких узлах и агрегатор.
+
+    export HOSTS_CHECKER_SECRET=...   (на всех узлах)
+    python cluster.py aggregator --listen 10.0.0.5:7600
+    python cluster.py worker --connect 10.0.0.5:7600 --bulk
+    python main.py --aggregator 10.0.0.5:7600
+
+Агрегатор опрашивает объединение списков хостов всех подписчиков и делит
+его между подключенными исполнителями по rendezvous-хэшированию: при подключении или уходе
+исполнителя переезжает только его доля хостов. Исполнители присылают
+результаты двоичными пачками, агрегатор пересылает их подписчикам (GUI
+или консольному режиму) без перекодирования. Адрес — "хост:порт" или
+"unix:/путь/к/сокету".
+
+Каждое подключение начинается с проверки общего ключа (HMAC-SHA256 от
+случайных чисел обеих сторон, сам ключ по сети не передается): без
+ключа нельзя ни назначить исполнителям хосты, ни читать результаты, а
+исполнитель не примет хосты от чужого агрегатора. Ключ берется из
+переменной HOSTS_CHECKER_SECRET или из файла (--secret-file). Без ключа
+агрегатор слушает только loopback и unix-сокет. Размер сообщения
+ограничен MAX_FRAME, до проверки ключа — HANDSHAKE_FRAME.
+
+Модуль не импортирует PyQt.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import math
+import os
+import socket
+import struct
+import sys
+import threading
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional
+
+from probe_engine import ProbeEngine, ProbeResult
+from scheduler import ProbeScheduler
+
+DEFAULT_ADDRESS = "127.0.0.1:7600"
+SECRET_ENV = "HOSTS_CHECKER_SECRET"
+
+# Типы сообщений
+MSG_HELLO = 1  # Исполнитель → агрегатор: имя исполнителя
+MSG_SUBSCRIBE = 2  # Подписчик → агрегатор
+MSG_HOSTS = 3  # Список (id, хост): назначение исполнителю, справочник подписчику
+               # или новый список хостов подписчика
+MSG_RESULTS = 4  # Пачка результатов
+MSG_CHALLENGE = 5  # Агрегатор → клиент: случайное число для проверки ключа
+MSG_AUTH = 6  # Клиент → агрегатор: подпись числа агрегатора и свое число;
+              # агрегатор → клиент: подпись числа клиента
+
+_FRAME = struct.Struct("!IB")  # Длина данных, тип
+_COUNT = struct.Struct("!I")
+_HOST = struct.Struct("!IH")  # id, длина имени
+# id, время, rtt, rtt_min, rtt_max, джиттер (NaN — нет), отправлено, получено, длина ошибки
+_RESULT = struct.Struct("!IdffffHHH")
+
+# Как часто исполнитель отправляет накопленные результаты, с
+BATCH_INTERVAL = 0.05
+# Предел неотправленных данных подписчику, после которого пачки отбрасываются
+MAX_SUBSCRIBER_BUFFER = 16 << 20
+# Наибольший размер сообщения: список из миллионов хостов еще помещается
+MAX_FRAME = 64 << 20
+# Наибольший размер сообщения до проверки ключа
+HANDSHAKE_FRAME = 256
+HANDSHAKE_TIMEOUT = 5.0
+NONCE_SIZE = 16
+
+
+class ProtocolError(ConnectionError):
+    """Нарушение протокола или неверный общий ключ"""
+
+
+# --- Протокол ---
+
+def encode_hosts(hosts: Iterable) -> bytes:
+    """[(id, хост), ...] → данные сообщения MSG_HOSTS"""
+    parts, count = [], 0
+    for host_id, host in hosts:
+        name = host.encode()
+        parts.append(_HOST.pack(host_id, len(name)))
+        parts.append(name)
+        count += 1
+    return _COUNT.pack(count) + b"".join(parts)
+
+
+def decode_hosts(data: bytes) -> List[tuple]:
+    (count,), offset = _COUNT.unpack_from(data), _COUNT.size
+    hosts = []
+    for _ in range(count):
+        host_id, size = _HOST.unpack_from(data, offset)
+        offset += _HOST.size
+        hosts.append((host_id, data[offset:offset + size].decode()))
+        offset += size
+    return hosts
+
+
+def encode_results(results: Iterable) -> bytes:
+    """[(id, ProbeResult), ...] → данные сообщения MSG_RESULTS"""
+    parts, count = [], 0
+    for host_id, result in results:
+        error = result.error.encode()[:0xFFFF] if result.error else b""
+        parts.append(_RESULT.pack(
+            host_id, result.timestamp, _nan_if_none(result.rtt), _nan_if_none(result.rtt_min),
+            _nan_if_none(result.rtt_max), _nan_if_none(result.jitter),
+            result.packets_sent, result.packets_received, len(error)
+        ))
+        parts.append(error)
+        count += 1
+    return _COUNT.pack(count) + b"".join(parts)
+
+
+def decode_results(data: bytes, hosts: Dict[int, str]) -> List[ProbeResult]:
+    """Разбор пачки; результаты хостов, которых нет в справочнике, пропускаются"""
+    (count,), offset = _COUNT.unpack_from(data), _COUNT.size
+    results = []
+    for _ in range(count):
+        host_id, timestamp, rtt, rtt_min, rtt_max, jitter, sent, received, size = _RESULT.unpack_from(data, offset)
+        offset += _RESULT.size
+        error = data[offset:offset + size].decode() if size else None
+        offset += size
+        host = hosts.get(host_id)
+        if host is not None:
+            results.append(ProbeResult(
+                host, timestamp, _none_if_nan(rtt), sent, received, error,
+                rtt_min=_none_if_nan(rtt_min), rtt_max=_none_if_nan(rtt_max), jitter=_none_if_nan(jitter)
+            ))
+    return results
+
+
+def _nan_if_none(value: Optional[float]) -> float:
+    return math.nan if value is None else value
+
+
+def _none_if_nan(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+async def read_message(reader: asyncio.StreamReader, max_size: int = MAX_FRAME):
+    size, kind = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+    if size > max_size:
+        # Длина приходит от собеседника: без предела readexactly выделил бы сколько угодно памяти
+        raise ProtocolError(f"сообщение {size} байт больше допустимых {max_size}")
+    return kind, await reader.readexactly(size)
+
+
+def write_message(writer: asyncio.StreamWriter, kind: int, data: bytes = b""):
+    writer.write(_FRAME.pack(len(data), kind))
+    writer.write(data)
+
+
+async def open_connection(address: str):
+    if address.startswith("unix:"):
+        return await asyncio.open_unix_connection(address[5:])
+    host, _, port = address.rpartition(":")
+    return await asyncio.open_connection(host, int(port))
+
+
+def load_secret(file_name: Optional[str] = None) -> bytes:
+    """Общий ключ из файла или переменной HOSTS_CHECKER_SECRET; b"" — ключ не задан"""
+    if file_name:
+        with open(file_name, "rb") as f:
+            return f.read().strip()
+    return os.environ.get(SECRET_ENV, "").encode()
+
+
+def _proof(secret: bytes, role: bytes, nonce: bytes) -> bytes:
+    return hmac.new(secret, role + nonce, hashlib.sha256).digest()
+
+
+async def accept_peer(reader, writer, secret: bytes):
+    """Проверка ключа подключившегося клиента (сторона агрегатора)"""
+    nonce = os.urandom(NONCE_SIZE)
+    write_message(writer, MSG_CHALLENGE, nonce)
+    kind, data = await read_message(reader, HANDSHAKE_FRAME)
+    proof, client_nonce = data[:-NONCE_SIZE], data[-NONCE_SIZE:]
+    if (kind != MSG_AUTH or len(client_nonce) != NONCE_SIZE
+            or not hmac.compare_digest(proof, _proof(secret, b"client", nonce))):
+        raise ProtocolError("неверный общий ключ")
+    write_message(writer, MSG_AUTH, _proof(secret, b"server", client_nonce))
+
+
+async def connect(address: str, secret: bytes):
+    """Подключение к агрегатору с проверкой ключа; ошибки — OSError"""
+    reader, writer = await open_connection(address)
+    try:
+        kind, nonce = await asyncio.wait_for(read_message(reader, HANDSHAKE_FRAME), HANDSHAKE_TIMEOUT)
+        if kind != MSG_CHALLENGE or len(nonce) != NONCE_SIZE:
+            raise ProtocolError("собеседник не агрегатор")
+        client_nonce = os.urandom(NONCE_SIZE)
+        write_message(writer, MSG_AUTH, _proof(secret, b"client", nonce) + client_nonce)
+        kind, proof = await asyncio.wait_for(read_message(reader, HANDSHAKE_FRAME), HANDSHAKE_TIMEOUT)
+        if kind != MSG_AUTH or not hmac.compare_digest(proof, _proof(secret, b"server", client_nonce)):
+            raise ProtocolError("агрегатор не подтвердил общий ключ")
+    except asyncio.TimeoutError:
+        writer.close()
+        raise ProtocolError("агрегатор не ответил на проверку ключа") from None
+    except asyncio.IncompleteReadError:
+        writer.close()
+        raise ProtocolError("агрегатор отклонил общий ключ") from None
+    except OSError:
+        writer.close()
+        raise
+    return reader, writer
+
+
+def is_public(address: str) -> bool:
+    """TCP-адрес, доступный не только с этого узла"""
+    if address.startswith("unix:"):
+        return False
+    host = address.rpartition(":")[0].strip("[]")
+    if host == "localhost":
+        return False
+    try:
+        return not ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return True  # Пустой адрес (все интерфейсы) или имя узла
+
+
+async def start_server(client_connected, address: str):
+    if address.startswith("unix:"):
+        path = address[5:]
+        if os.path.exists(path):
+            os.unlink(path)
+        return await asyncio.start_unix_server(client_connected, path)
+    host, _, port = address.rpartition(":")
+    return await asyncio.start_server(client_connected, host, int(port))
+
+
+def rendezvous_owner(host: str, workers: List[str]) -> str:
+    """Исполнитель хоста: с наибольшим хэшем пары (исполнитель, хост)"""
+    key = host.encode()
+    return max(workers, key=lambda worker: zlib.crc32(key, zlib.crc32(worker.encode())))
+
+
+# --- Агрегатор ---
+
+class Aggregator:
+    """
+    Агрегатор: раздает хосты исполнителям и пересылает результаты подписчикам.
+
+    У каждого подписчика свой список хостов; опрашивается объединение этих
+    списков и начального списка агрегатора. Отключение подписчика убирает
+    только те хосты, которые больше никому не нужны.
+
+    Id хоста постоянен, пока хост есть в списке, поэтому справочник
+    подписчика обновляется только при изменении списка. Результаты
+    пересылаются в том виде, в котором пришли от исполнителя; медленный
+    подписчик теряет пачки, а не задерживает остальных.
+    """
+
+    def __init__(self, hosts: Iterable[str] = (), secret: bytes = b""):
+        self.secret = secret
+        self._ids: Dict[str, int] = {}
+        self._next_id = 1
+        self._workers: Dict[str, asyncio.StreamWriter] = {}
+        self._assigned: Dict[str, frozenset] = {}
+        self._subscribers = set()
+        self._own_hosts: List[str] = []  # Начальный список агрегатора (--hosts)
+        self._subscriber_hosts: Dict[asyncio.StreamWriter, List[str]] = {}
+        self.dropped = 0  # Пачки, не отправленные медленным подписчикам
+        self.set_hosts(hosts)
+
+    @property
+    def hosts(self) -> List[str]:
+        return list(self._ids)
+
+    def set_hosts(self, hosts: Iterable[str], subscriber: Optional[asyncio.StreamWriter] = None):
+        """Замена списка хостов подписчика или, без subscriber, собственного списка агрегатора"""
+        hosts = list(dict.fromkeys(hosts))
+        if subscriber is None:
+            self._own_hosts = hosts
+        elif hosts:
+            self._subscriber_hosts[subscriber] = hosts
+        else:
+            self._subscriber_hosts.pop(subscriber, None)
+        self._update_hosts()
+
+    def _update_hosts(self):
+        union = dict.fromkeys(self._own_hosts)
+        for hosts in self._subscriber_hosts.values():
+            union.update(dict.fromkeys(hosts))
+        if union.keys() == self._ids.keys():
+            return
+
+        ids = {}
+        for host in union:
+            host_id = self._ids.get(host)
+            if host_id is None:
+                host_id, self._next_id = self._next_id, self._next_id + 1
+            ids[host] = host_id
+        self._ids = ids
+
+        directory = encode_hosts((host_id, host) for host, host_id in ids.items())
+        for writer in self._subscribers:
+            write_message(writer, MSG_HOSTS, directory)
+        self.rebalance()
+
+    def rebalance(self):
+        """Перераспределение хостов; сообщение получают только исполнители с изменившейся долей"""
+        workers = sorted(self._workers)
+        shares = {worker: [] for worker in workers}
+        if workers:
+            for host in self._ids:
+                shares[rendezvous_owner(host, workers)].append(host)
+
+        for worker, hosts in shares.items():
+            assigned = frozenset(hosts)
+            if self._assigned.get(worker) != assigned:
+                self._assigned[worker] = assigned
+                write_message(self._workers[worker], MSG_HOSTS,
+                              encode_hosts((self._ids[host], host) for host in hosts))
+        print(f"Исполнителей: {len(workers)}, хостов: {len(self._ids)}", file=sys.stderr)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            await asyncio.wait_for(accept_peer(reader, writer, self.secret), HANDSHAKE_TIMEOUT)
+            kind, data = await read_message(reader)
+            if kind == MSG_HELLO:
+                await self._serve_worker(data.decode() or "worker", reader, writer)
+            elif kind == MSG_SUBSCRIBE:
+                await self._serve_subscriber(reader, writer)
+        except (ProtocolError, asyncio.TimeoutError, struct.error, UnicodeDecodeError) as e:
+            peer = writer.get_extra_info("peername") or "unix"
+            print(f"Отклонено подключение {peer}: {str(e) or 'нет ответа на проверку ключа'}", file=sys.stderr)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_worker(self, name, reader, writer):
+        # Имя должно быть уникальным: от него зависит доля хостов
+        base, number = name, 1
+        while name in self._workers:
+            number += 1
+            name = f"{base}#{number}"
+
+        self._workers[name] = writer
+        print(f"Подключен исполнитель {name}", file=sys.stderr)
+        self.rebalance()
+        try:
+            while True:
+                kind, data = await read_message(reader)
+                if kind == MSG_RESULTS:
+                    self._forward(data)
+        finally:
+            del self._workers[name]
+            self._assigned.pop(name, None)
+            print(f"Отключен исполнитель {name}", file=sys.stderr)
+            self.rebalance()
+
+    async def _serve_subscriber(self, reader, writer):
+        write_message(writer, MSG_HOSTS, encode_hosts((host_id, host) for host, host_id in self._ids.items()))
+        self._subscribers.add(writer)
+        try:
+            while True:
+                kind, data = await read_message(reader)
+                if kind == MSG_HOSTS:
+                    self.set_hosts((host for _, host in decode_hosts(data)), writer)
+        finally:
+            self._subscribers.discard(writer)
+            if self._subscriber_hosts.pop(writer, None) is not None:
+                self._update_hosts()
+
+    def _forward(self, data: bytes):
+        for writer in self._subscribers:
+            if writer.transport.get_write_buffer_size() > MAX_SUBSCRIBER_BUFFER:
+                self.dropped += 1
+                continue
+            write_message(writer, MSG_RESULTS, data)
+
+
+async def run_aggregator(address: str, hosts: Iterable[str] = (), secret: bytes = b""):
+    aggregator = Aggregator(hosts, secret)
+    server = await start_server(aggregator.handle, address)
+    print(f"Агрегатор слушает {address}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+# --- Исполнитель ---
+
+class Worker:
+    """
+    Исполнитель: опрашивает назначенную агрегатором долю хостов.
+
+    При обрыве связи опрос останавливается (агрегатор уже отдал эти
+    хосты другим исполнителям), после переподключения доля назначается
+    заново.
+    """
+
+    def __init__(self, address: str, name: Optional[str] = None, secret: Optional[bytes] = None,
+                 **engine_options):
+        self.address = address
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.secret = load_secret() if secret is None else secret
+        scheduler_options = {
+            "interval": engine_options.pop("interval", 1.0),
+            "max_backoff": engine_options.pop("max_backoff", 60.0),
+        }
+        self.engine = ProbeEngine(on_result=self._on_result,
+                                  scheduler=ProbeScheduler(**scheduler_options), **engine_options)
+
+        self._ids: Dict[str, int] = {}
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def _on_result(self, result: ProbeResult):
+        # Вызывается из потока движка
+        with self._lock:
+            self._pending.append(result)
+
+    async def run(self):
+        delay = 1.0
+        while True:
+            try:
+                reader, writer = await connect(self.address, self.secret)
+            except OSError as e:
+                print(f"Нет связи с агрегатором {self.address}: {e}", file=sys.stderr)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 10.0)
+                continue
+
+            delay = 1.0
+            write_message(writer, MSG_HELLO, self.name.encode())
+            sender = asyncio.create_task(self._send(writer))
+            try:
+                while True:
+                    kind, data = await read_message(reader)
+                    if kind == MSG_HOSTS:
+                        await self._assign(decode_hosts(data))
+            except (asyncio.IncompleteReadError, ConnectionError):
+                print("Связь с агрегатором потеряна", file=sys.stderr)
+            finally:
+                sender.cancel()
+                writer.close()
+            await self._assign([])
+
+    async def _assign(self, hosts):
+        previous = self._ids
+        self._ids = {host: host_id for host_id, host in hosts}
+        if not hosts:
+            with self._lock:
+                self._pending = []
+        print(f"Назначено хостов: {len(hosts)}", file=sys.stderr)
+
+        if hosts and self.engine.running:
+            # При перераспределении меняется только разница, остальные хосты опрашиваются без перерыва
+            self.engine.remove_hosts(host for host in previous if host not in self._ids)
+            self.engine.add_hosts(host for host in self._ids if host not in previous)
+            return
+        # Запуск и остановка ждут поток движка — не в цикле событий
+        loop = asyncio.get_running_loop()
+        if hosts:
+            await loop.run_in_executor(None, self.engine.start, list(self._ids))
+        else:
+            await loop.run_in_executor(None, self.engine.stop)
+
+    async def _send(self, writer: asyncio.StreamWriter):
+        while True:
+            await asyncio.sleep(BATCH_INTERVAL)
+            with self._lock:
+                batch, self._pending = self._pending, []
+            ids = self._ids
+            # Результаты хостов, отобранных при перераспределении, не отправляются
+            batch = [(ids[result.host], result) for result in batch if result.host in ids]
+            if batch:
+                write_message(writer, MSG_RESULTS, encode_results(batch))
+                await writer.drain()
+
+    def close(self):
+        self.engine.stop()
+
+
+# --- Подписчик ---
+
+class RemoteProbeEngine:
+    """
+    Получение результатов от агрегатора вместо локального опроса.
+
+    Интерфейс совпадает с ProbeEngine: start(hosts) передает агрегатору
+    список хостов, add_hosts()/remove_hosts() передают измененный список,
+    результаты приходят в on_result из рабочего потока, stop() очищает
+    список на агрегаторе и отключается. Результаты хостов, которые
+    опрашиваются для других подписчиков, отбрасываются.
+    """
+
+    def __init__(self, address: str, on_result: Callable[[ProbeResult], None],
+                 secret: Optional[bytes] = None):
+        self.address = address
+        self.on_result = on_result
+        self.secret = load_secret() if secret is None else secret
+
+        self._thread = None
+        self._loop = None
+        self._main_task = None
+        self._hosts = {}  # Упорядоченное множество хостов подписчика
+        self._writer = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, hosts: Iterable[str]):
+        if self.running:
+            self.stop()
+        hosts = list(dict.fromkeys(hosts))
+        ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(hosts, ready), name="RemoteProbeEngine", daemon=True
+        )
+        self._thread.start()
+        ready.wait()
+
+    def stop(self, timeout: float = 1.0):
+        if self._loop is not None and self._main_task is not None:
+            self._loop.call_soon_threadsafe(self._main_task.cancel)
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def add_hosts(self, hosts: Iterable[str]):
+        self._post(self._change_hosts, list(hosts), [])
+
+    def remove_hosts(self, hosts: Iterable[str]):
+        self._post(self._change_hosts, [], list(hosts))
+
+    def _post(self, func, *args):
+        loop = self._loop
+        if loop is not None and self.running:
+            try:
+                loop.call_soon_threadsafe(func, *args)
+            except RuntimeError:
+                pass  # Цикл событий уже закрыт
+
+    def _change_hosts(self, added, removed):
+        for host in removed:
+            self._hosts.pop(host, None)
+        self._hosts.update(dict.fromkeys(added))
+        if self._writer is not None:
+            write_message(self._writer, MSG_HOSTS, encode_hosts((0, host) for host in self._hosts))
+
+    def _run(self, hosts, ready: threading.Event):
+        loop = self._loop = asyncio.new_event_loop()
+        try:
+            self._main_task = loop.create_task(self._main(hosts))
+            ready.set()
+            loop.run_until_complete(self._main_task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            ready.set()
+            loop.close()
+            if self._loop is loop:
+                self._loop = None
+                self._main_task = None
+
+    async def _main(self, hosts):
+        self._hosts = dict.fromkeys(hosts)
+        delay = 1.0
+        while True:
+            try:
+                reader, writer = await connect(self.address, self.secret)
+            except OSError as e:
+                print(f"Нет связи с агрегатором {self.address}: {e}", file=sys.stderr)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 10.0)
+                continue
+
+            delay = 1.0
+            self._writer = writer
+            try:
+                write_message(writer, MSG_SUBSCRIBE)
+                write_message(writer, MSG_HOSTS, encode_hosts((0, host) for host in self._hosts))
+                await self._receive(reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                print("Связь с агрегатором потеряна", file=sys.stderr)
+            except asyncio.CancelledError:
+                # Остановка наблюдения: опрос на исполнителях тоже прекращается
+                try:
+                    write_message(writer, MSG_HOSTS, encode_hosts(()))
+                    await asyncio.wait_for(writer.drain(), 1.0)
+                except (OSError, asyncio.TimeoutError):
+                    pass
+                raise
+            finally:
+                self._writer = None
+                writer.close()
+
+    async def _receive(self, reader):
+        directory = {}
+        while True:
+            kind, data = await read_message(reader)
+            if kind == MSG_HOSTS:
+                directory = dict(decode_hosts(data))
+            elif kind == MSG_RESULTS:
+                for result in decode_results(data, directory):
+                    if result.host not in self._hosts:
+                        continue
+                    try:
+                        self.on_result(result)
+                    except Exception as e:
+                        print(f"Ошибка обработки результата {result.host}: {e}", file=sys.stderr)
+
+
+# --- Запуск ---
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Распределенный опрос хостов")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    aggregator = commands.add_parser("aggregator", help="агрегатор результатов")
+    aggregator.add_argument("--listen", default=DEFAULT_ADDRESS, help="адрес 'хост:порт' или 'unix:путь'")
+    aggregator.add_argument("--hosts", help="CSV с начальным списком хостов")
+    aggregator.add_argument("--secret-file", help=f"файл с общим ключом (по умолчанию ${SECRET_ENV})")
+
+    worker = commands.add_parser("worker", help="исполнитель опроса")
+    worker.add_argument("--connect", default=DEFAULT_ADDRESS, help="адрес агрегатора")
+    worker.add_argument("--name", help="имя исполнителя (по умолчанию узел-pid)")
+    worker.add_argument("--secret-file", help=f"файл с общим ключом (по умолчанию ${SECRET_ENV})")
+    worker.add_argument("--interval", type=float, default=1.0, help="интервал опроса хоста, с")
+    worker.add_argument("--max-backoff", type=float, default=60.0,
+                        help="максимальный интервал опроса недоступного хоста, с")
+    worker.add_argument("--timeout", type=float, default=1.0, help="таймаут ответа, с")
+    worker.add_argument("--concurrency", type=int, default=1000, help="максимум одновременных проверок")
+    worker.add_argument("--privileged", action="store_true", help="использовать raw-сокеты")
+    worker.add_argument("--bulk", action="store_true", help="все запросы через один общий ICMP-сокет")
+    worker.add_argument("--count", type=int, default=1, help="пакетов в серии на каждую проверку")
+    worker.add_argument("--burst-interval", type=float, default=0.2, help="промежуток между пакетами серии, с")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    secret = load_secret(args.secret_file)
+    if args.command == "aggregator":
+        if not secret and is_public(args.listen):
+            print(f"Агрегатор без общего ключа слушает только loopback или unix-сокет: "
+                  f"задайте {SECRET_ENV} или --secret-file", file=sys.stderr)
+            return 2
+        hosts = []
+        if args.hosts:
+            from host_import import iter_csv_hosts
+
+            hosts = list(iter_csv_hosts(args.hosts))
+        coroutine = run_aggregator(args.listen, hosts, secret)
+        worker = None
+    else:
+        worker = Worker(args.connect, args.name, secret, interval=args.interval, max_backoff=args.max_backoff,
+                        timeout=args.timeout, concurrency=args.concurrency,
+                        privileged=args.privileged, bulk=args.bulk,
+                        count=args.count, burst_interval=args.burst_interval)
+        coroutine = worker.run()
+
+    try:
+        asyncio.run(coroutine)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if worker is not None:
+            worker.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+"""
+Консольный режим без графического интерфейса.
+
+Опрашивает хосты из CSV (формат экспорта приложения) и пишет результаты
+в формате JSON Lines в stdout или в файл:
+
+    python headless.py hosts.csv
+    python headless.py hosts.csv -o results.jsonl --aggregate 60
+
+Модуль не импортирует PyQt, поэтому подходит для серверов без дисплея.
+"""
+import argparse
+import json
+import math
+import queue
+import signal
+import sys
+import threading
+import time
+
+from host_import import iter_csv_hosts
+from probe_engine import ProbeEngine, ProbeResult
+from scheduler import ProbeScheduler
+from tracing import TRACER
+
+
+class JsonLinesWriter:
+    """Буферизованная запись JSON Lines со сбросом на диск не чаще flush_interval"""
+
+    def __init__(self, stream, flush_interval: float = 1.0):
+        self.stream = stream
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+
+    def write(self, record: dict):
+        self.stream.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self.stream.write('\n')
+
+    def maybe_flush(self):
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.stream.flush()
+        self._last_flush = time.monotonic()
+
+
+def result_record(result: ProbeResult) -> dict:
+    return {
+        "ts": round(result.timestamp, 3),
+        "host": result.host,
+        "rtt": None if result.rtt is None else round(result.rtt, 3),
+        "rtt_min": None if result.rtt_min is None else round(result.rtt_min, 3),
+        "rtt_max": None if result.rtt_max is None else round(result.rtt_max, 3),
+        "jitter": None if result.jitter is None else round(result.jitter, 3),
+        "sent": result.packets_sent,
+        "received": result.packets_received,
+        "loss": result.loss,
+        "error": result.error,
+        "overhead": None if result.overhead is None else round(result.overhead, 3),
+    }
+
+
+class Aggregator:
+    """
+    Периодические агрегаты по хостам на основе HostStats.
+
+    Окно до минуты считается по отдельным пакетам: min/avg/max, джиттер,
+    перцентили и потери. Для более длинного окна кольцо пакетов остается
+    минутным, а агрегаты (min/avg/max и потери) берутся из минутных
+    корзин с точностью до минуты: память на хост не растет с окном.
+    """
+
+    def __init__(self, hosts, window: int, interval: float, count: int = 1):
+        # numpy нужен только в режиме агрегатов
+        from host_stats import BUCKET_SECONDS, HostStats, raw_samples_for
+
+        self.hosts = list(hosts)
+        self.window = int(window)
+        self._slot_of = {host: slot for slot, host in enumerate(self.hosts)}
+        if self.window <= BUCKET_SECONDS:
+            windows = (self.window,)
+        else:
+            windows = (BUCKET_SECONDS, self.window)
+        self.stats = HostStats(raw_samples=raw_samples_for(windows[0], interval, count), windows=windows)
+        self.stats.ensure_capacity(len(self.hosts))
+        self.stats.reset(range(len(self.hosts)))
+
+    def add(self, result: ProbeResult):
+        slot = self._slot_of.get(result.host)
+        if slot is None or not result.packets_sent:
+            return
+        packets = result.packet_rtts()
+        self.stats.record([slot] * len(packets), [result.timestamp] * len(packets), packets)
+
+    def records(self):
+        now = time.time()
+        stats = self.stats.window_stats(range(len(self.hosts)), self.window, now)
+        for slot, host in enumerate(self.hosts):
+            record = {"ts": round(now, 3), "host": host, "window": self.window}
+            for name, values in stats.items():
+                value = float(values[slot])
+                record[name] = None if math.isnan(value) else round(value, 3)
+            yield record
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Мониторинг хостов без графического интерфейса")
+    parser.add_argument("csv", help="CSV со списком хостов (первый столбец, разделитель ';')")
+    parser.add_argument("-o", "--output", default="-", help="файл JSON Lines, '-' — stdout")
+    parser.add_argument("--interval", type=float, default=1.0, help="интервал опроса хоста, с")
+    parser.add_argument("--max-backoff", type=float, default=60.0,
+                        help="максимальный интервал опроса недоступного хоста, с")
+    parser.add_argument("--timeout", type=float, default=1.0, help="таймаут ответа, с")
+    parser.add_argument("--count", type=int, default=1,
+                        help="пакетов в серии на каждую проверку (потери и джиттер по серии)")
+    parser.add_argument("--burst-interval", type=float, default=0.2, help="промежуток между пакетами серии, с")
+    parser.add_argument("--concurrency", type=int, default=1000, help="максимум одновременных проверок")
+    parser.add_argument("--privileged", action="store_true", help="использовать raw-сокеты")
+    parser.add_argument("--bulk", action="store_true",
+                        help="все запросы через один общий ICMP-сокет вместо сокета на проверку")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="число процессов опроса (больше 1 — режим bulk в каждом процессе)")
+    parser.add_argument("--aggregator",
+                        help="получать результаты от агрегатора распределенного опроса (хост:порт)")
+    parser.add_argument("--aggregate", type=int, default=0,
+                        help="вместо каждого результата писать агрегаты за это окно, целые секунды")
+    parser.add_argument("--flush-interval", type=float, default=1.0, help="период сброса буфера, с")
+    parser.add_argument("--history", help="файл SQLite для хранения истории опроса")
+    parser.add_argument("--duration", type=float, default=0, help="время работы, с (0 — без ограничения)")
+    parser.add_argument("--metrics-port", type=int,
+                        help="порт HTTP-точки /metrics на 127.0.0.1 (формат Prometheus)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="вести трассировку и сохранить ее в FILE (Chrome Trace) при выходе и по SIGUSR1")
+    args = parser.parse_args(argv)
+    if args.aggregate < 0:
+        parser.error("--aggregate: окно должно быть положительным числом секунд")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    hosts = list(dict.fromkeys(iter_csv_hosts(
+        args.csv,
+        on_invalid=lambda host: print(f"Ошибка: {host} — неверный формат адреса", file=sys.stderr)
+    )))
+    if not hosts:
+        print("Нет валидных хостов для опроса", file=sys.stderr)
+        return 1
+
+    stream = sys.stdout if args.output == "-" else open(args.output, "a", encoding="utf-8", buffering=1 << 16)
+    writer = JsonLinesWriter(stream, args.flush_interval)
+    aggregator = Aggregator(hosts, args.aggregate, args.interval, args.count) if args.aggregate else None
+
+    results = queue.SimpleQueue()
+    history_store = None
+    if args.history:
+        from history_store import HistoryStore
+
+        history_store = HistoryStore(args.history)
+
+        def on_result(result):
+            results.put(result)
+            history_store.add(result)
+    else:
+        on_result = results.put
+
+    if args.aggregator:
+        from cluster import RemoteProbeEngine
+
+        engine = RemoteProbeEngine(args.aggregator, on_result=on_result)
+    elif args.workers > 1:
+        from probe_pool import ProbePool
+
+        engine = ProbePool(
+            on_result=on_result,
+            workers=args.workers,
+            concurrency=args.concurrency,
+            interval=args.interval,
+            timeout=args.timeout,
+            privileged=args.privileged,
+            max_backoff=args.max_backoff,
+            count=args.count,
+            burst_interval=args.burst_interval
+        )
+    else:
+        engine = ProbeEngine(
+            on_result=on_result,
+            concurrency=args.concurrency,
+            timeout=args.timeout,
+            privileged=args.privileged,
+            scheduler=ProbeScheduler(interval=args.interval, max_backoff=args.max_backoff),
+            bulk=args.bulk,
+            count=args.count,
+            burst_interval=args.burst_interval
+        )
+
+    metrics_server = None
+    if args.metrics_port:
+        from metrics import MetricsServer
+
+        metrics_server = MetricsServer(args.metrics_port)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    dump_trace = threading.Event()
+    if args.trace:
+        TRACER.enable()
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda *_: dump_trace.set())
+
+    started = time.monotonic()
+    next_aggregate = started + args.aggregate
+    engine.start(hosts)
+    print(f"Опрос {len(hosts)} хостов запущен", file=sys.stderr)
+    try:
+        while not stop.is_set():
+            try:
+                result = results.get(timeout=0.1)
+            except queue.Empty:
+                result = None
+
+            # Забираем все накопившиеся результаты за один проход
+            with TRACER.span("write_results", "headless"):
+                while result is not None:
+                    if aggregator is not None:
+                        aggregator.add(result)
+                    else:
+                        writer.write(result_record(result))
+                    try:
+                        result = results.get_nowait()
+                    except queue.Empty:
+                        result = None
+
+            now = time.monotonic()
+            if aggregator is not None and now >= next_aggregate:
+                for record in aggregator.records():
+                    writer.write(record)
+                next_aggregate += args.aggregate
+
+            writer.maybe_flush()
+            if dump_trace.is_set():
+                dump_trace.clear()
+                print(f"Трассировка: {TRACER.save(args.trace)} событий в {args.trace}", file=sys.stderr)
+            if args.duration and now - started >= args.duration:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+        if metrics_server is not None:
+            metrics_server.close()
+        if history_store is not None:
+            history_store.close()
+        writer.flush()
+        if stream is not sys.stdout:
+            stream.close()
+        if args.trace:
+            print(f"Трассировка: {TRACER.save(args.trace)} событий в {args.trace}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import closing
+from typing import Iterator, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    id INTEGER PRIMARY KEY,
+    host TEXT NOT NULL UNIQUE
+);
+-- Сырые результаты: ключ (хост, время) кластеризует историю хоста
+CREATE TABLE IF NOT EXISTS samples (
+    host_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,          -- мс от эпохи
+    rtt REAL,                     -- мс, NULL — ответа нет
+    sent INTEGER NOT NULL,
+    received INTEGER NOT NULL,
+    PRIMARY KEY (host_id, ts)
+) WITHOUT ROWID;
+-- Поминутные агрегаты для длительного хранения
+CREATE TABLE IF NOT EXISTS samples_1m (
+    host_id INTEGER NOT NULL,
+    minute INTEGER NOT NULL,      -- минут от эпохи
+    sent INTEGER NOT NULL,
+    received INTEGER NOT NULL,
+    rtt_min REAL,
+    rtt_avg REAL,
+    rtt_max REAL,
+    PRIMARY KEY (host_id, minute)
+) WITHOUT ROWID;
+"""
+
+_STOP = object()
+
+
+class HistoryStore:
+    """
+    Хранилище истории опроса на SQLite (режим WAL).
+
+    add() только кладет результат в ограниченную очередь и никогда не
+    блокирует движок опроса: при переполнении результат отбрасывается
+    и учитывается в dropped. Запись ведет отдельный поток пачками — одна
+    транзакция на batch_size результатов или на flush_interval секунд.
+
+    Раз в maintenance_interval сырые результаты старше raw_retention
+    сворачиваются в поминутные агрегаты, агрегаты старше
+    downsampled_retention удаляются.
+    """
+
+    def __init__(self, path: str,
+                 raw_retention: float = 24 * 3600,
+                 downsampled_retention: float = 30 * 24 * 3600,
+                 batch_size: int = 5000,
+                 flush_interval: float = 1.0,
+                 queue_size: int = 200000,
+                 maintenance_interval: float = 300):
+        self.path = path
+        self.raw_retention = raw_retention
+        self.downsampled_retention = downsampled_retention
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.maintenance_interval = maintenance_interval
+
+        self.dropped = 0  # Результаты, не попавшие в очередь
+        self.written = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+
+        # Схема создается сразу, чтобы чтение работало до первой записи
+        db = self._connect()
+        db.executescript(SCHEMA)
+        db.close()
+
+        self._thread = threading.Thread(target=self._writer, name="HistoryStore", daemon=True)
+        self._thread.start()
+
+    # --- Запись ---
+
+    def add(self, result):
+        if not result.packets_sent:
+            return
+        try:
+            self._queue.put_nowait((
+                result.host,
+                int(result.timestamp * 1000),
+                result.rtt if result.is_alive else None,
+                result.packets_sent,
+                result.packets_received,
+            ))
+        except queue.Full:
+            self.dropped += 1
+
+    @property
+    def backlog(self) -> int:
+        return self._queue.qsize()
+
+    def close(self, timeout: float = 5.0):
+        """Запись остатка очереди и остановка потока записи"""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _writer(self):
+        db = sqlite3.connect(self.path, isolation_level=None)
+        self._configure(db)
+        host_ids = dict(db.execute("SELECT host, id FROM hosts"))
+        next_maintenance = time.monotonic() + self.maintenance_interval
+
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            if batch:
+                self._write_batch(db, batch, host_ids)
+
+            if time.monotonic() >= next_maintenance:
+                self.maintain(db)
+                next_maintenance = time.monotonic() + self.maintenance_interval
+
+        db.close()
+
+    def _write_batch(self, db, batch, host_ids):
+        new_hosts = {item[0] for item in batch if item[0] not in host_ids}
+        db.execute("BEGIN")
+        try:
+            if new_hosts:
+                db.executemany("INSERT OR IGNORE INTO hosts (host) VALUES (?)", ((h,) for h in new_hosts))
+                for host in new_hosts:
+                    host_ids[host] = db.execute("SELECT id FROM hosts WHERE host = ?", (host,)).fetchone()[0]
+            db.executemany(
+                "INSERT OR REPLACE INTO samples (host_id, ts, rtt, sent, received) VALUES (?, ?, ?, ?, ?)",
+                ((host_ids[host], ts, rtt, sent, received) for host, ts, rtt, sent, received in batch)
+            )
+            db.execute("COMMIT")
+            self.written += len(batch)
+        except sqlite3.Error as e:
+            db.execute("ROLLBACK")
+            print(f"Ошибка записи истории: {e}", file=sys.stderr)
+
+    # --- Обслуживание ---
+
+    def maintain(self, db=None):
+        """Свертка старых сырых данных в поминутные и удаление устаревших агрегатов"""
+        own = db is None
+        if own:
+            db = sqlite3.connect(self.path, isolation_level=None)
+            self._configure(db)
+
+        now_ms = int(time.time() * 1000)
+        # Граница выравнивается по минуте, чтобы минута не делилась между таблицами
+        raw_cutoff = (now_ms - int(self.raw_retention * 1000)) // 60000 * 60000
+        minute_cutoff = (now_ms - int(self.downsampled_retention * 1000)) // 60000
+
+        host_ids = [row[0] for row in db.execute("SELECT id FROM hosts")]
+        for host_id in host_ids:
+            # Выборка по префиксу первичного ключа — без полного сканирования
+            db.execute("BEGIN")
+            try:
+                db.execute(
+                    """
+                    INSERT OR REPLACE INTO samples_1m
+                        (host_id, minute, sent, received, rtt_min, rtt_avg, rtt_max)
+                    SELECT host_id, ts / 60000, SUM(sent), SUM(received), MIN(rtt), AVG(rtt), MAX(rtt)
+                    FROM samples
+                    WHERE host_id = ? AND ts < ?
+                    GROUP BY ts / 60000
+                    """,
+                    (host_id, raw_cutoff)
+                )
+                db.execute("DELETE FROM samples WHERE host_id = ? AND ts < ?", (host_id, raw_cutoff))
+                db.execute("DELETE FROM samples_1m WHERE host_id = ? AND minute < ?", (host_id, minute_cutoff))
+                db.execute("COMMIT")
+            except sqlite3.Error as e:
+                db.execute("ROLLBACK")
+                print(f"Ошибка обслуживания истории: {e}", file=sys.stderr)
+
+        if own:
+            db.close()
+
+    # --- Чтение ---
+
+    def query(self, host: str, start: float, end: float) -> List[Tuple[float, Optional[float], int, int]]:
+        """Сырые результаты хоста за [start, end): (время, rtt, отправлено, получено)"""
+        return list(self.iter_samples(host, start, end))
+
+    def iter_samples(self, host: str, start: float, end: float) -> Iterator[Tuple]:
+        with closing(self._connect()) as db:
+            yield from db.execute(
+                """
+                SELECT s.ts / 1000.0, s.rtt, s.sent, s.received
+                FROM samples s JOIN hosts h ON h.id = s.host_id
+                WHERE h.host = ? AND s.ts >= ? AND s.ts < ?
+                ORDER BY s.ts
+                """,
+                (host, int(start * 1000), int(end * 1000))
+            )
+
+    def query_downsampled(self, host: str, start: float, end: float) -> List[Tuple]:
+        """Поминутные агрегаты хоста: (время начала минуты, отправлено, получено, min, avg, max)"""
+        with closing(self._connect()) as db:
+            return db.execute(
+                """
+                SELECT m.minute * 60, m.sent, m.received, m.rtt_min, m.rtt_avg, m.rtt_max
+                FROM samples_1m m JOIN hosts h ON h.id = m.host_id
+                WHERE h.host = ? AND m.minute >= ? AND m.minute < ?
+                ORDER BY m.minute
+                """,
+                (host, int(start // 60), int(-(-end // 60)))
+            ).fetchall()
+
+    def hosts(self) -> List[str]:
+        with closing(self._connect()) as db:
+            return [row[0] for row in db.execute("SELECT host FROM hosts ORDER BY host")]
+
+    def host_ids(self) -> List[Tuple[int, str]]:
+        with closing(self._connect()) as db:
+            return db.execute("SELECT id, host FROM hosts ORDER BY host").fetchall()
+
+    def iter_host_chunks(self, host_id: int, start: float, end: float,
+                         downsampled: bool = False, chunk: int = 10000) -> Iterator[List[Tuple]]:
+        """
+        История одного хоста за [start, end) пачками не больше chunk строк.
+
+        Сырые строки: (время, rtt, отправлено, получено); поминутные:
+        (время начала минуты, отправлено, получено, min, avg, max).
+        Выборка идет по префиксу первичного ключа, весь диапазон в память
+        не загружается. Соединение открывается на время выборки и
+        закрывается, когда генератор исчерпан или закрыт.
+        """
+        with closing(self._connect()) as db:
+            yield from self._iter_chunks(db, host_id, start, end, downsampled, chunk)
+
+    @staticmethod
+    def _iter_chunks(db, host_id, start, end, downsampled, chunk):
+        if downsampled:
+            cursor = db.execute(
+                """
+                SELECT minute * 60, sent, received, rtt_min, rtt_avg, rtt_max
+                FROM samples_1m WHERE host_id = ? AND minute >= ? AND minute < ?
+                ORDER BY minute
+                """,
+                (host_id, int(start // 60), int(-(-end // 60)))
+            )
+        else:
+            cursor = db.execute(
+                """
+                SELECT ts / 1000.0, rtt, sent, received
+                FROM samples WHERE host_id = ? AND ts >= ? AND ts < ?
+                ORDER BY ts
+                """,
+                (host_id, int(start * 1000), int(end * 1000))
+            )
+        while True:
+            rows = cursor.fetchmany(chunk)
+            if not rows:
+                return
+            yield rows
+
+    def _connect(self):
+        # Чтение идет из любых потоков: соединение открывается на каждый вызов и сразу закрывается
+        db = sqlite3.connect(self.path)
+        self._configure(db)
+        return db
+
+    @staticmethod
+    def _configure(db):
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("PRAGMA busy_timeout=5000")
@@ -1,73 +1,151 @@
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtWidgets import (
     QDialog,
     QVBoxLayout,
-    QTextEdit,
+    QPlainTextEdit,
     QDialogButtonBox,
-    QMessageBox
+    QMessageBox,
+    QProgressDialog
 )
-from PyQt6.QtGui import QStandardItem
+
+from host_import import expand_hosts, iter_csv_targets, iter_text_targets
+
+# Сколько неверных записей выводить в журнал поштучно
+MAX_REPORTED_INVALID = 20
+
+
+class ImportWorker(QThread):
+    """
+    Разбор и разворачивание записей в фоновом потоке.
+
+    Источник — вставленный текст или CSV-файл, оба читаются потоково.
+    Повторы отбрасываются по снимку уже существующих хостов, модель
+    получает результат одной пачкой через finished_import.
+    """
+    progress = pyqtSignal(int)  # Проценты
+    finished_import = pyqtSignal(list, list, int)  # Новые хосты, [(запись, причина)], число повторов
+    failed = pyqtSignal(str)  # Текст ошибки чтения
+
+    def __init__(self, existing, text=None, file_name=None, parent=None):
+        super().__init__(parent)
+        self.existing = frozenset(existing)
+        self.text = text
+        self.file_name = file_name
+        self._percent = -1
+
+    def run(self):
+        try:
+            self._import()
+        except Exception as e:
+            self.failed.emit(str(e))
+
+    def _import(self):
+        invalid = []
+        duplicates = 0
+
+        def on_duplicate(host):
+            nonlocal duplicates
+            duplicates += 1
+
+        if self.file_name:
+            targets = iter_csv_targets(self.file_name, on_progress=self._report_progress)
+        else:
+            targets = self._iter_text()
+
+        hosts = []
+        for host in expand_hosts(targets, self.existing,
+                                 on_invalid=lambda target, reason: invalid.append((target, reason)),
+                                 on_duplicate=on_duplicate):
+            hosts.append(host)
+            if not len(hosts) % 4096 and self.isInterruptionRequested():
+                return
+
+        if not self.isInterruptionRequested():
+            self.finished_import.emit(hosts, invalid, duplicates)
+
+    def _iter_text(self):
+        lines = list(iter_text_targets(self.text))
+        for number, line in enumerate(lines):
+            if not number % 1024:
+                self._report_progress(number, len(lines))
+            yield line
+        self._report_progress(len(lines), len(lines))
+
+    def _report_progress(self, done, total):
+        percent = int(done * 100 / total) if total else 100
+        if percent != self._percent:
+            self._percent = percent
+            self.progress.emit(percent)
+
+
+def start_import(parent, worker: ImportWorker, on_done):
+    """Запуск импорта с окном прогресса и возможностью отмены"""
+    progress = QProgressDialog("Импорт хостов...", "Отмена", 0, 100, parent)
+    progress.setWindowModality(Qt.WindowModality.WindowModal)
+    progress.setMinimumDuration(300)
+
+    worker.progress.connect(progress.setValue)
+    progress.canceled.connect(worker.requestInterruption)
+    worker.finished_import.connect(on_done)
+    worker.failed.connect(lambda error: QMessageBox.critical(parent, "Ошибка", error))
+    worker.finished.connect(progress.reset)
+    worker.finished.connect(worker.deleteLater)
+    worker.start()
+
+
+def report_import(status_log, added, invalid, duplicates):
+    """Итоги импорта в журнал: неверные записи поштучно (с ограничением) и сводка"""
+    for target, reason in invalid[:MAX_REPORTED_INVALID]:
+        status_log.warning(f"Ошибка: {target} — {reason}")
+    if len(invalid) > MAX_REPORTED_INVALID:
+        status_log.warning(f"Пропущено еще {len(invalid) - MAX_REPORTED_INVALID} неверных записей")
+    if duplicates:
+        status_log.warning(f"Предупреждение: {duplicates} хостов уже существуют в списке")
+    if added:
+        status_log.info(f"Добавлено {len(added)} хостов")
 
 
 class HostAddDialog(QDialog):
-    def __init__(self, table_model, status_text):
+    def __init__(self, table_model, status_log):
         super().__init__()
         self.host_input = None
+        self.btn_box = None
         self.table_model = table_model
-        self.status_text = status_text
+        self.status_log = status_log
         self.init_ui()
 
     def init_ui(self):
         layout = QVBoxLayout()
 
-        self.host_input = QTextEdit()
-        self.host_input.setPlaceholderText("Вставьте хосты (каждый с новой строки)")
+        self.host_input = QPlainTextEdit()
+        self.host_input.setPlaceholderText(
+            "Вставьте хосты (каждый с новой строки)\n"
+            "Допускаются имена, сети (10.0.0.0/24) и диапазоны (10.0.0.1-20)"
+        )
         layout.addWidget(self.host_input)
 
-        btn_box = QDialogButtonBox(
+        self.btn_box = QDialogButtonBox(
             QDialogButtonBox.StandardButton.Ok |
             QDialogButtonBox.StandardButton.Cancel
         )
-        btn_box.accepted.connect(self.add_hosts)
-        btn_box.rejected.connect(self.reject)
-        layout.addWidget(btn_box)
+        self.btn_box.accepted.connect(self.add_hosts)
+        self.btn_box.rejected.connect(self.reject)
+        layout.addWidget(self.btn_box)
 
         self.setLayout(layout)
 
     def add_hosts(self):
-        text = self.host_input.toPlainText()
-        hosts = [line.strip() for line in text.split('\n') if line.strip()]
-
-        valid_hosts = []
-        for host in hosts:
-            if is_valid_ip(host):
-                valid_hosts.append(host)
-            else:
-                self.status_text.append(f"Ошибка: {host} — неверный формат IP")
-
-        added_hosts = []
-        for host in valid_hosts:
-            # Проверка на существование хоста в таблице
-            exists = False
-            for row in range(self.table_model.rowCount()):
-                item = self.table_model.item(row, 0)
-                if item and item.text() == host:
-                    exists = True
-                    break
-            if not exists:
-                added_hosts.append(host)
-                new_row = [
-                    host,
-                    "0",
-                    "0%",
-                    "0%",
-                    "00:00:00"
-                ]
-                self.table_model.appendRow([QStandardItem(item) for item in new_row])
-            else:
-                self.status_text.append(f"Предупреждение: {host} уже существует в списке")
+        self.btn_box.setEnabled(False)
+        worker = ImportWorker(self.table_model.hosts(), text=self.host_input.toPlainText(), parent=self)
+        worker.finished.connect(lambda: self.btn_box.setEnabled(True))
+        start_import(self, worker, self._on_import_done)
+
+    def _on_import_done(self, hosts, invalid, duplicates):
+        # Все хосты добавляются в модель одной вставкой
+        added_hosts = self.table_model.add_hosts(hosts)
+        report_import(self.status_log, added_hosts, invalid, duplicates)
 
         if added_hosts:
-            self.status_text.append(f"Добавлено {len(added_hosts)} хостов")
             self.host_input.clear()
             self.accept()
         else:
@@ -76,16 +154,3 @@ class HostAddDialog(QDialog):
                 "Ошибка",
                 "Нет валидных хостов для добавления или все хосты уже существуют"
             )
-
-
-def is_valid_ip(ip):
-    parts = ip.split('.')
-    if len(parts) != 4:
-        return False
-    for part in parts:
-        if not part.isdigit():
-            return False
-        num = int(part)
-        if not (0 <= num <= 255):
-            return False
-    return True
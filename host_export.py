@@ -0,0 +1,208 @@
+"""
+Потоковый экспорт таблицы и истории опроса.
+
+Форматы истории выбираются по расширению файла:
+- .csv, .csv.gz — CSV с разделителем ';';
+- .jsonl, .jsonl.gz — JSON Lines;
+- .hcol, .hcol.gz — колоночный двоичный формат (см. write_columnar).
+
+Данные пишутся пачками, целиком в памяти не держатся. Функции
+принимают on_progress(сделано, всего) и is_cancelled() и не зависят от Qt.
+write_atomically подменяет файл назначения только после успешной записи.
+"""
+import csv
+import gzip
+import json
+import math
+import os
+import struct
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Строк таблицы в одной пачке записи
+EXPORT_CHUNK = 5000
+
+HISTORY_FORMATS = ("csv", "jsonl", "hcol")
+
+RAW_FIELDS = ("ts", "rtt", "sent", "received")
+DOWNSAMPLED_FIELDS = ("ts", "sent", "received", "rtt_min", "rtt_avg", "rtt_max")
+
+RAW_HEADERS = ["Хост", "Время", "RTT, мс", "Отправлено", "Получено"]
+DOWNSAMPLED_HEADERS = ["Хост", "Начало минуты", "Отправлено", "Получено",
+                       "RTT min, мс", "RTT avg, мс", "RTT max, мс"]
+
+# Колоночный формат: заголовок, справочник хостов, блоки столбцов, маркер конца
+HCOL_MAGIC = b"HCOL"
+HCOL_VERSION = 1
+_HCOL_HEADER = struct.Struct("<4sBBI")  # сигнатура, версия, вид (0 — сырые, 1 — поминутные), число хостов
+_HCOL_BLOCK = struct.Struct("<cI")  # b"B" — блок, b"E" — конец; число строк
+RAW_COLUMNS = (("host", "<u4"), ("ts", "<f8"), ("rtt", "<f4"), ("sent", "<u2"), ("received", "<u2"))
+DOWNSAMPLED_COLUMNS = (("host", "<u4"), ("ts", "<f8"), ("sent", "<u4"), ("received", "<u4"),
+                       ("rtt_min", "<f4"), ("rtt_avg", "<f4"), ("rtt_max", "<f4"))
+
+
+def history_format(file_name: str) -> str:
+    name = file_name.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    for fmt in HISTORY_FORMATS:
+        if name.endswith("." + fmt):
+            return fmt
+    raise ValueError(f"Неизвестный формат файла: {file_name}")
+
+
+def open_output(file_name: str, binary: bool = False):
+    """Файл для записи; для имени с .gz — со сжатием gzip"""
+    if file_name.lower().endswith(".gz"):
+        return gzip.open(file_name, "wb" if binary else "wt", compresslevel=6,
+                         **({} if binary else {"encoding": "utf-8", "newline": ""}))
+    if binary:
+        return open(file_name, "wb")
+    return open(file_name, "w", encoding="utf-8-sig", newline="")
+
+
+def write_atomically(file_name: str, job: Callable[[str], int],
+                     is_cancelled: Callable[[], bool] = lambda: False) -> int:
+    """
+    Запись через временный файл рядом с file_name: job(временное имя)
+    пишет данные и возвращает число строк. Файл назначения подменяется
+    целиком после успешной записи; при отмене или ошибке временный файл
+    удаляется, а прежний файл назначения остается нетронутым.
+    """
+    head, tail = os.path.split(file_name)
+    # Расширение сохраняется: по нему выбираются формат и сжатие
+    tmp_name = os.path.join(head, f".tmp-{os.getpid()}-{tail}")
+    try:
+        count = job(tmp_name)
+        if not is_cancelled():
+            os.replace(tmp_name, file_name)
+        return count
+    finally:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+
+
+def export_table(snapshot, file_name: str,
+                 on_progress: Optional[Callable[[int, int], None]] = None,
+                 is_cancelled: Callable[[], bool] = lambda: False) -> int:
+    """Снимок таблицы (HostTableModel.snapshot()) в CSV; возвращает число строк"""
+    total = len(snapshot)
+    with open_output(file_name) as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(snapshot.headers)
+        for start in range(0, total, EXPORT_CHUNK):
+            if is_cancelled():
+                return start
+            writer.writerows(snapshot.rows(start, start + EXPORT_CHUNK))
+            if on_progress is not None:
+                on_progress(min(start + EXPORT_CHUNK, total), total)
+    return total
+
+
+def export_history(store, file_name: str, start: float, end: float, downsampled: bool = False,
+                   hosts: Optional[List[str]] = None,
+                   on_progress: Optional[Callable[[int, int], None]] = None,
+                   is_cancelled: Callable[[], bool] = lambda: False) -> int:
+    """
+    История за [start, end) из HistoryStore в файл; формат — по расширению.
+
+    hosts ограничивает набор хостов. Возвращает число записанных строк.
+    """
+    fmt = history_format(file_name)
+    host_ids = store.host_ids()
+    if hosts is not None:
+        wanted = set(hosts)
+        host_ids = [(host_id, host) for host_id, host in host_ids if host in wanted]
+
+    def chunks() -> Iterator[Tuple[int, str, list]]:
+        for number, (host_id, host) in enumerate(host_ids):
+            if is_cancelled():
+                return
+            for rows in store.iter_host_chunks(host_id, start, end, downsampled):
+                yield number, host, rows
+            if on_progress is not None:
+                on_progress(number + 1, len(host_ids))
+
+    if fmt == "hcol":
+        with open_output(file_name, binary=True) as f:
+            return write_columnar(f, [host for _, host in host_ids], chunks(), downsampled)
+
+    count = 0
+    with open_output(file_name) as f:
+        if fmt == "csv":
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(DOWNSAMPLED_HEADERS if downsampled else RAW_HEADERS)
+            for _, host, rows in chunks():
+                writer.writerows((host, *row) for row in rows)
+                count += len(rows)
+        else:
+            fields = DOWNSAMPLED_FIELDS if downsampled else RAW_FIELDS
+            for _, host, rows in chunks():
+                f.writelines(
+                    json.dumps({"host": host, **dict(zip(fields, row))}, separators=(",", ":")) + "\n"
+                    for row in rows
+                )
+                count += len(rows)
+    return count
+
+
+def write_columnar(f, hosts: List[str], chunks, downsampled: bool = False) -> int:
+    """
+    Колоночный двоичный формат (.hcol), все числа little-endian:
+
+        заголовок   "HCOL", версия u8, вид u8 (0 — сырые, 1 — поминутные), число хостов u32
+        справочник  для каждого хоста: длина u16, имя UTF-8
+        блоки       "B", число строк u32, затем столбцы подряд (RAW_COLUMNS
+                    или DOWNSAMPLED_COLUMNS); host — номер в справочнике,
+                    ts — секунды от эпохи, отсутствующий RTT — NaN
+        конец       "E", общее число строк u32
+
+    chunks выдает (номер хоста, хост, строки); каждая пачка — один блок.
+    """
+    columns = DOWNSAMPLED_COLUMNS if downsampled else RAW_COLUMNS
+    f.write(_HCOL_HEADER.pack(HCOL_MAGIC, HCOL_VERSION, int(downsampled), len(hosts)))
+    for host in hosts:
+        name = host.encode()
+        f.write(struct.pack("<H", len(name)) + name)
+
+    count = 0
+    for number, _, rows in chunks:
+        f.write(_HCOL_BLOCK.pack(b"B", len(rows)))
+        values = list(zip(*rows))
+        f.write(np.full(len(rows), number, dtype=columns[0][1]).tobytes())
+        for (name, dtype), column in zip(columns[1:], values):
+            if name.startswith("rtt"):
+                column = [math.nan if value is None else value for value in column]
+            f.write(np.asarray(column, dtype=dtype).tobytes())
+        count += len(rows)
+    f.write(_HCOL_BLOCK.pack(b"E", count))
+    return count
+
+
+def read_columnar(file_name: str):
+    """Чтение .hcol: (хосты, поминутный ли, итератор блоков {столбец: массив numpy})"""
+    f = gzip.open(file_name, "rb") if file_name.lower().endswith(".gz") else open(file_name, "rb")
+    magic, version, kind, host_count = _HCOL_HEADER.unpack(f.read(_HCOL_HEADER.size))
+    if magic != HCOL_MAGIC or version != HCOL_VERSION:
+        f.close()
+        raise ValueError(f"{file_name}: не файл истории HCOL версии {HCOL_VERSION}")
+    hosts = []
+    for _ in range(host_count):
+        (size,) = struct.unpack("<H", f.read(2))
+        hosts.append(f.read(size).decode())
+    columns = DOWNSAMPLED_COLUMNS if kind else RAW_COLUMNS
+
+    def blocks():
+        with f:
+            while True:
+                marker, rows = _HCOL_BLOCK.unpack(f.read(_HCOL_BLOCK.size))
+                if marker == b"E":
+                    return
+                block = {}
+                for name, dtype in columns:
+                    size = np.dtype(dtype).itemsize * rows
+                    block[name] = np.frombuffer(f.read(size), dtype=dtype)
+                yield block
+
+    return hosts, bool(kind), blocks()
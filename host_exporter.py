@@ -0,0 +1,140 @@
+from PyQt6.QtCore import Qt, QThread, QDateTime, pyqtSignal
+from PyQt6.QtWidgets import (
+    QDialog,
+    QFormLayout,
+    QDateTimeEdit,
+    QComboBox,
+    QDialogButtonBox,
+    QFileDialog,
+    QMessageBox,
+    QProgressDialog
+)
+
+from host_export import export_history, export_table, history_format, write_atomically
+
+TABLE_FILTER = "CSV Files (*.csv);;CSV gzip (*.csv.gz);;All Files (*)"
+HISTORY_FILTER = "CSV gzip (*.csv.gz);;JSON Lines gzip (*.jsonl.gz);;Колоночный формат (*.hcol);;All Files (*)"
+
+
+class ExportWorker(QThread):
+    """
+    Экспорт в фоновом потоке.
+
+    job(имя файла, on_progress, is_cancelled) выполняет запись и
+    возвращает число строк. Пишется временный файл, который занимает
+    место file_name только после успешного завершения, поэтому отмена
+    или ошибка не оставляют обрезанного файла. GUI-поток получает только
+    проценты и итог.
+    """
+    progress = pyqtSignal(int)  # Проценты
+    finished_export = pyqtSignal(str, int)  # Файл, число строк
+    failed = pyqtSignal(str)  # Текст ошибки
+
+    def __init__(self, job, file_name, parent=None):
+        super().__init__(parent)
+        self.job = job
+        self.file_name = file_name
+        self._percent = -1
+
+    def run(self):
+        try:
+            count = write_atomically(
+                self.file_name,
+                lambda target: self.job(target, self._report_progress, self.isInterruptionRequested),
+                self.isInterruptionRequested
+            )
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        if not self.isInterruptionRequested():
+            self.finished_export.emit(self.file_name, count)
+
+    def _report_progress(self, done, total):
+        percent = int(done * 100 / total) if total else 100
+        if percent != self._percent:
+            self._percent = percent
+            self.progress.emit(percent)
+
+
+def start_export(parent, worker: ExportWorker, on_done):
+    """Запуск экспорта с окном прогресса и возможностью отмены"""
+    progress = QProgressDialog("Экспорт...", "Отмена", 0, 100, parent)
+    progress.setWindowModality(Qt.WindowModality.WindowModal)
+    progress.setMinimumDuration(300)
+
+    worker.progress.connect(progress.setValue)
+    progress.canceled.connect(worker.requestInterruption)
+    worker.finished_export.connect(on_done)
+    worker.failed.connect(lambda error: QMessageBox.critical(parent, "Ошибка", error))
+    worker.finished.connect(progress.reset)
+    worker.finished.connect(worker.deleteLater)
+    worker.start()
+
+
+def table_export_worker(parent, table_model):
+    """Выбор файла и подготовка экспорта таблицы; None, если пользователь отказался"""
+    file_name, _ = QFileDialog.getSaveFileName(parent, "Сохранить CSV", "", TABLE_FILTER)
+    if not file_name:
+        return None
+    # Снимок делается в GUI-потоке, дальше модель может меняться
+    snapshot = table_model.snapshot()
+    return ExportWorker(
+        lambda target, on_progress, is_cancelled: export_table(snapshot, target, on_progress, is_cancelled),
+        file_name, parent
+    )
+
+
+class HistoryExportDialog(QDialog):
+    """Выбор периода и детализации для экспорта истории"""
+
+    def __init__(self, history_store, parent=None):
+        super().__init__(parent)
+        self.history_store = history_store
+        self.setWindowTitle("Экспорт истории")
+
+        now = QDateTime.currentDateTime()
+        self.start_edit = QDateTimeEdit(now.addDays(-1))
+        self.end_edit = QDateTimeEdit(now)
+        for edit in (self.start_edit, self.end_edit):
+            edit.setCalendarPopup(True)
+            edit.setDisplayFormat("yyyy-MM-dd HH:mm")
+
+        self.resolution = QComboBox()
+        self.resolution.addItem("Все проверки", False)
+        self.resolution.addItem("Поминутные агрегаты", True)
+
+        btn_box = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok |
+            QDialogButtonBox.StandardButton.Cancel
+        )
+        btn_box.accepted.connect(self.accept)
+        btn_box.rejected.connect(self.reject)
+
+        layout = QFormLayout()
+        layout.addRow("С", self.start_edit)
+        layout.addRow("По", self.end_edit)
+        layout.addRow("Детализация", self.resolution)
+        layout.addRow(btn_box)
+        self.setLayout(layout)
+
+    def export_worker(self):
+        """Выбор файла и подготовка экспорта истории; None при отказе"""
+        file_name, _ = QFileDialog.getSaveFileName(self, "Сохранить историю", "", HISTORY_FILTER)
+        if not file_name:
+            return None
+        try:
+            history_format(file_name)
+        except ValueError as e:
+            QMessageBox.warning(self, "Ошибка", f"{e}. Допустимы .csv, .jsonl, .hcol (и .gz)")
+            return None
+        start = self.start_edit.dateTime().toSecsSinceEpoch()
+        end = self.end_edit.dateTime().toSecsSinceEpoch()
+        downsampled = self.resolution.currentData()
+        store = self.history_store
+        return ExportWorker(
+            lambda target, on_progress, is_cancelled: export_history(
+                store, target, start, end, downsampled,
+                on_progress=on_progress, is_cancelled=is_cancelled
+            ),
+            file_name, self.parent()
+        )
@@ -0,0 +1,158 @@
+import csv
+import ipaddress
+import os
+import re
+from typing import Callable, Iterable, Iterator, Optional
+
+# Максимум адресов, в которые может развернуться одна запись (сеть /16)
+MAX_EXPANSION = 65536
+
+# Ведущие нули допускаются (10.0.0.01) и отбрасываются при разворачивании
+_OCTET = r"(?:25[0-5]|2[0-4]\d|[01]?\d?\d)"
+_IPV4_RE = re.compile(rf"(?:{_OCTET}\.){{3}}{_OCTET}")
+_SHORT_RANGE_RE = re.compile(rf"((?:{_OCTET}\.){{3}})({_OCTET})-({_OCTET})")
+_LABEL_RE = re.compile(r"[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?")
+
+
+def is_valid_ip(ip):
+    return _IPV4_RE.fullmatch(ip) is not None
+
+
+def is_valid_hostname(name):
+    """Имя хоста по RFC 1123; последняя метка не может быть числом"""
+    name = name.lower().rstrip('.')
+    if not name or len(name) > 253:
+        return False
+    labels = name.split('.')
+    return not labels[-1].isdigit() and all(_LABEL_RE.fullmatch(label) for label in labels)
+
+
+def _int_to_ip(n: int) -> str:
+    return f"{n >> 24}.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"
+
+
+def _ip_to_int(ip: str) -> int:
+    a, b, c, d = ip.split('.')
+    return int(a) << 24 | int(b) << 16 | int(c) << 8 | int(d)
+
+
+def expand_target(target: str) -> Iterator[str]:
+    """
+    Разворачивание записи в адреса: IP (с ведущими нулями в октетах
+    выдается в каноническом виде), сеть CIDR (10.0.0.0/24),
+    диапазон последнего октета (10.0.0.1-20) или полный диапазон
+    (10.0.0.1-10.0.1.255). Адреса выдаются лениво. Имя хоста
+    (router-1.example.net) выдается как есть в нижнем регистре и
+    разрешается при опросе.
+
+    Для неверной записи или слишком большого диапазона — ValueError.
+    """
+    if is_valid_ip(target):
+        # Октеты читаются как десятичные: 10.0.0.010 — это 10.0.0.10
+        yield _int_to_ip(_ip_to_int(target))
+        return
+
+    if '/' in target:
+        try:
+            network = ipaddress.IPv4Network(target, strict=False)
+        except ValueError:
+            raise ValueError("неверный формат сети") from None
+        if network.prefixlen >= 31:
+            first, last = int(network.network_address), int(network.broadcast_address)
+        else:
+            # Адрес сети и широковещательный адрес не опрашиваются
+            first, last = int(network.network_address) + 1, int(network.broadcast_address) - 1
+    else:
+        match = _SHORT_RANGE_RE.fullmatch(target)
+        if match:
+            prefix = match.group(1)
+            first = _ip_to_int(prefix + match.group(2))
+            last = _ip_to_int(prefix + match.group(3))
+        else:
+            start, sep, end = target.partition('-')
+            if not sep or not is_valid_ip(start.strip()) or not is_valid_ip(end.strip()):
+                if is_valid_hostname(target):
+                    yield target.lower().rstrip('.')
+                    return
+                raise ValueError("неверный формат адреса")
+            first, last = _ip_to_int(start.strip()), _ip_to_int(end.strip())
+
+    if last < first:
+        raise ValueError("конец диапазона меньше начала")
+    if last - first + 1 > MAX_EXPANSION:
+        raise ValueError(f"диапазон больше {MAX_EXPANSION} адресов")
+
+    for n in range(first, last + 1):
+        yield _int_to_ip(n)
+
+
+def iter_text_targets(text: str) -> Iterator[str]:
+    """Записи из вставленного текста: по одной на строку"""
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            yield line
+
+
+def iter_csv_targets(file_name: str,
+                     on_progress: Optional[Callable[[int, int], None]] = None) -> Iterator[str]:
+    """
+    Потоковое чтение записей из CSV в формате экспорта (разделитель ';',
+    строка заголовков, хост в первом столбце).
+
+    on_progress(прочитано байт, размер файла) вызывается по мере чтения.
+    """
+    size = os.path.getsize(file_name)
+    consumed = 0
+
+    def lines():
+        nonlocal consumed
+        with open(file_name, 'rb') as f:
+            for raw in f:
+                consumed += len(raw)
+                yield raw.decode('utf-8-sig')
+
+    reader = csv.reader(lines(), delimiter=';')
+    next(reader, None)  # Пропуск заголовков
+    for number, row in enumerate(reader):
+        if row and row[0].strip():
+            yield row[0].strip()
+        if on_progress is not None and number % 4096 == 0:
+            on_progress(consumed, size)
+    if on_progress is not None:
+        on_progress(size, size)
+
+
+def expand_hosts(targets: Iterable[str],
+                 existing=frozenset(),
+                 on_invalid: Optional[Callable[[str, str], None]] = None,
+                 on_duplicate: Optional[Callable[[str], None]] = None) -> Iterator[str]:
+    """
+    Разворачивание записей в уникальные адреса.
+
+    Повторы внутри потока и адреса из existing отбрасываются через
+    проверку по множеству; on_invalid(запись, причина) получает
+    неверные записи.
+    """
+    seen = set()
+    for target in targets:
+        try:
+            for host in expand_target(target):
+                if host in existing or host in seen:
+                    if on_duplicate is not None:
+                        on_duplicate(host)
+                    continue
+                seen.add(host)
+                yield host
+        except ValueError as e:
+            if on_invalid is not None:
+                on_invalid(target, str(e))
+
+
+def iter_csv_hosts(file_name: str,
+                   on_invalid: Optional[Callable[[str], None]] = None) -> Iterator[str]:
+    """Уникальные адреса из CSV (с разворачиванием сетей и диапазонов)"""
+    return expand_hosts(
+        iter_csv_targets(file_name),
+        on_invalid=None if on_invalid is None else (lambda target, reason: on_invalid(target))
+    )
@@ -0,0 +1,451 @@
+import sys
+import time
+from typing import Iterable, List
+
+import numpy as np
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor
+
+from host_stats import BUCKET_SECONDS, HostStats, window_label
+
+COLUMNS = [
+    "Хост",
+    "Ping, мс",
+    "% доставленных",
+    "% недоставленных",
+    "Время последнего ping"
+]
+COL_HOST, COL_RTT, COL_DELIVERED, COL_LOSS, COL_LAST_PING = range(len(COLUMNS))
+# Необязательный последний столбец с графиком (рисует SparklineDelegate)
+SPARKLINE_HEADER = "История RTT"
+
+COLOR_ALIVE = QColor("green")
+COLOR_DEAD = QColor("red")
+
+
+class HostTableModel(QAbstractTableModel):
+    """
+    Модель таблицы хостов на колоночном хранилище.
+
+    Каждый хост занимает постоянный слот в массивах numpy (RTT, доставка,
+    потери, время последнего ответа). Порядок строк задается отдельной
+    перестановкой _order (строка → слот), поэтому сортировка не двигает
+    данные. Строки для отображения формируются только в data(), то есть
+    только для видимых ячеек.
+
+    После основных столбцов идут столбцы скользящей статистики HostStats,
+    которая использует те же слоты, и, если включен, столбец графика
+    истории RTT без текста.
+    """
+
+    def __init__(self, parent=None, stats: HostStats = None):
+        super().__init__(parent)
+        self.stats = stats if stats is not None else HostStats()
+        self._hosts = []  # слот → хост (None для свободного слота)
+        self._slot_of = {}  # хост → слот
+        self._free = []  # освобожденные слоты
+
+        self._rtt = np.empty(0, dtype=np.float64)  # мс, NaN — нет ответа
+        self._delivered = np.empty(0, dtype=np.float64)  # %
+        self._loss = np.empty(0, dtype=np.float64)  # %
+        self._last_seen = np.empty(0, dtype=np.float64)  # epoch, 0 — не опрашивался
+        self._overhead = np.empty(0, dtype=np.float64)  # мс, исключенные из RTT; NaN — неизвестно
+
+        self._order = np.empty(0, dtype=np.int64)  # строка → слот
+        self._row_of = np.empty(0, dtype=np.int64)  # слот → строка
+        self._sparkline = False
+
+    # --- Интерфейс QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.data_column_count() + self._sparkline
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            if section < len(COLUMNS):
+                return COLUMNS[section]
+            if section == self.sparkline_column():
+                return f"{SPARKLINE_HEADER} {window_label(self.stats.windows[-1])}"
+            return self.stats.columns[section - len(COLUMNS)][1]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        slot = self._order[index.row()]
+        col = index.column()
+        if col >= self.data_column_count():
+            return None
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._display_text(slot, col)
+
+        if role == Qt.ItemDataRole.ForegroundRole and col != COL_HOST:
+            if not self._last_seen[slot]:
+                return None
+            return COLOR_DEAD if np.isnan(self._rtt[slot]) else COLOR_ALIVE
+
+        if role == Qt.ItemDataRole.ToolTipRole and col == COL_RTT:
+            overhead = self._overhead[slot]
+            if not np.isnan(overhead):
+                return f"Накладные расходы измерения: {overhead:.3f} мс (исключены из RTT)"
+
+        return None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if not len(self._order) or column >= self.data_column_count():
+            return
+
+        self.layoutAboutToBeChanged.emit([], QAbstractTableModel.LayoutChangeHint.VerticalSortHint)
+
+        descending = order == Qt.SortOrder.DescendingOrder
+        if column == COL_HOST:
+            hosts = self._hosts
+            new_order = np.array(
+                sorted(self._order, key=hosts.__getitem__, reverse=descending),
+                dtype=np.int64
+            )
+        else:
+            keys = self._sort_keys(column)[self._order]
+            # NaN (нет данных) всегда в конце списка
+            positions = np.argsort(-keys if descending else keys, kind="stable")
+            new_order = self._order[positions]
+
+        # Запоминаем слоты сохраненных индексов (выделение) до перестановки
+        old_indexes = self.persistentIndexList()
+        old_slots = [self._order[idx.row()] for idx in old_indexes]
+
+        self._order = new_order
+        self._row_of[new_order] = np.arange(len(new_order))
+
+        new_indexes = [
+            self.index(int(self._row_of[slot]), idx.column())
+            for slot, idx in zip(old_slots, old_indexes)
+        ]
+        self.changePersistentIndexList(old_indexes, new_indexes)
+
+        self.layoutChanged.emit([], QAbstractTableModel.LayoutChangeHint.VerticalSortHint)
+
+    # --- Столбцы ---
+
+    def data_column_count(self) -> int:
+        """Столбцы с текстовыми значениями (без графика)"""
+        return len(COLUMNS) + len(self.stats.columns)
+
+    def sparkline_column(self) -> int:
+        """Номер столбца графика (постоянный, даже пока столбец скрыт)"""
+        return self.data_column_count()
+
+    def sparkline_visible(self) -> bool:
+        return self._sparkline
+
+    def set_sparkline_visible(self, visible: bool):
+        if visible == self._sparkline:
+            return
+        column = self.sparkline_column()
+        if visible:
+            self.beginInsertColumns(QModelIndex(), column, column)
+            self._sparkline = True
+            self.endInsertColumns()
+        else:
+            self.beginRemoveColumns(QModelIndex(), column, column)
+            self._sparkline = False
+            self.endRemoveColumns()
+
+    def sparkline_key(self, row: int):
+        """(слот, версия) строки — ключ кэша графика; версия меняется с новыми пакетами и каждую минуту"""
+        slot = int(self._order[row])
+        return slot, (int(self.stats.version(slot)), int(time.time() // BUCKET_SECONDS))
+
+    def sparkline_values(self, slot: int):
+        """Поминутные (минимумы, максимумы, доля потерь) слота за самое длинное окно статистики"""
+        return self.stats.minute_history(slot)
+
+    # --- Работа с хостами ---
+
+    def hosts(self) -> List[str]:
+        """Список хостов в порядке строк"""
+        return [self._hosts[slot] for slot in self._order]
+
+    def host_at(self, row: int) -> str:
+        return self._hosts[self._order[row]]
+
+    def has_host(self, host: str) -> bool:
+        return host in self._slot_of
+
+    def row_of(self, host: str) -> int:
+        """Номер строки хоста или -1"""
+        slot = self._slot_of.get(host)
+        return -1 if slot is None else int(self._row_of[slot])
+
+    def add_hosts(self, hosts: Iterable[str]) -> List[str]:
+        """Добавление хостов одной вставкой, возвращает реально добавленные"""
+        added = []
+        seen = set()
+        for host in hosts:
+            if host in self._slot_of or host in seen:
+                continue
+            seen.add(host)
+            added.append(sys.intern(host))
+        if not added:
+            return added
+
+        first = len(self._order)
+        self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+
+        slots = self._allocate_slots(added)
+        self._order = np.concatenate((self._order, np.array(slots, dtype=np.int64)))
+        self._row_of[slots] = np.arange(first, len(self._order))
+
+        self.endInsertRows()
+        return added
+
+    def remove_rows(self, rows: Iterable[int]):
+        """Удаление строк; смежные строки удаляются одним диапазоном"""
+        rows = sorted(set(rows), reverse=True)
+        while rows:
+            last = first = rows.pop(0)
+            while rows and rows[0] == first - 1:
+                first = rows.pop(0)
+
+            self.beginRemoveRows(QModelIndex(), first, last)
+            for slot in self._order[first:last + 1]:
+                self._release_slot(int(slot))
+            self._order = np.delete(self._order, np.s_[first:last + 1])
+            self._row_of[self._order] = np.arange(len(self._order))
+            self.endRemoveRows()
+
+    def apply_results(self, results):
+        """
+        Применение пачки результатов опроса.
+
+        Для каждого хоста учитывается последний результат в пачке,
+        представление получает одно уведомление dataChanged.
+        """
+        self._record_stats(results)
+        latest = {result.host: result for result in results}
+
+        slot_of = self._slot_of
+        slots, rtt, delivered, loss, timestamps, overhead = [], [], [], [], [], []
+        for host, result in latest.items():
+            slot = slot_of.get(host)
+            if slot is None:
+                continue
+            slots.append(slot)
+            rtt.append(result.rtt if result.is_alive else np.nan)
+            delivered.append(result.delivered)
+            loss.append(result.loss)
+            timestamps.append(result.timestamp)
+            overhead.append(np.nan if result.overhead is None else result.overhead)
+
+        # Запись в колонки выполняется векторно для всей пачки
+        self._rtt[slots] = rtt
+        self._delivered[slots] = delivered
+        self._loss[slots] = loss
+        self._last_seen[slots] = timestamps
+        self._overhead[slots] = overhead
+
+        if slots:
+            rows = self._row_of[slots]
+            self.dataChanged.emit(
+                self.index(int(rows.min()), COL_RTT),
+                self.index(int(rows.max()), COL_LAST_PING)
+            )
+
+    def refresh_stats(self):
+        """Пересчет скользящей статистики одним проходом и одно уведомление представлению"""
+        slots = self.stats.refresh()
+        if len(slots):
+            rows = self._row_of[slots]
+            self.dataChanged.emit(
+                self.index(int(rows.min()), len(COLUMNS)),
+                self.index(int(rows.max()), self.columnCount() - 1)
+            )
+
+    def row_texts(self, row: int) -> List[str]:
+        """Отображаемые значения строки (для экспорта)"""
+        slot = self._order[row]
+        return [self._display_text(slot, col) for col in range(self.data_column_count())]
+
+    def snapshot(self) -> "TableSnapshot":
+        """Согласованная копия таблицы в текущем порядке строк для чтения из другого потока"""
+        order = self._order
+        return TableSnapshot(
+            [self.headerData(col, Qt.Orientation.Horizontal) for col in range(self.data_column_count())],
+            [self._hosts[slot] for slot in order],
+            self._rtt[order], self._delivered[order], self._loss[order], self._last_seen[order],
+            self.stats.values[order]
+        )
+
+    def state(self):
+        """Хосты в порядке строк и их метрики (для снимка сеанса)"""
+        order = self._order
+        return self.hosts(), {
+            "rtt": self._rtt[order],
+            "delivered": self._delivered[order],
+            "loss": self._loss[order],
+            "last_seen": self._last_seen[order],
+        }
+
+    def restore_state(self, hosts: List[str], columns):
+        """
+        Загрузка хостов с сохраненными метриками одной вставкой.
+
+        columns — массивы rtt, delivered, loss, last_seen в порядке hosts;
+        значения копируются в слоты векторно. Скользящая статистика не
+        восстанавливается и набирается заново.
+        """
+        if not hosts:
+            return
+        self.add_hosts(hosts)
+        slot_of = self._slot_of
+        slots = np.fromiter((slot_of[host] for host in hosts), dtype=np.int64, count=len(hosts))
+        self._rtt[slots] = columns["rtt"]
+        self._delivered[slots] = columns["delivered"]
+        self._loss[slots] = columns["loss"]
+        self._last_seen[slots] = columns["last_seen"]
+        self.dataChanged.emit(self.index(0, COL_RTT), self.index(len(self._order) - 1, COL_LAST_PING))
+
+    # --- Внутреннее ---
+
+    def _record_stats(self, results):
+        # В статистику попадает каждый отправленный пакет, в том числе все пакеты серии
+        slot_of = self._slot_of
+        slots, timestamps, rtts = [], [], []
+        for result in results:
+            slot = slot_of.get(result.host)
+            if slot is None or not result.packets_sent:
+                continue
+            if result.packets_sent == 1:
+                slots.append(slot)
+                timestamps.append(result.timestamp)
+                rtts.append(result.rtt if result.is_alive else np.nan)
+                continue
+            packets = result.packet_rtts()
+            slots.extend([slot] * len(packets))
+            timestamps.extend([result.timestamp] * len(packets))
+            rtts.extend(packets)
+        if slots:
+            self.stats.record(slots, timestamps, rtts)
+
+    def _display_text(self, slot, col):
+        if col == COL_HOST:
+            return self._hosts[slot]
+        if col >= len(COLUMNS):
+            return _stat_text(self.stats.values[slot, col - len(COLUMNS)])
+        return _cell_text(col, self._rtt[slot], self._delivered[slot], self._loss[slot], self._last_seen[slot])
+
+    def _sort_keys(self, column):
+        if column >= len(COLUMNS):
+            return self.stats.values[:len(self._rtt), column - len(COLUMNS)]
+        if column == COL_RTT:
+            return self._rtt
+        # Хосты, которые еще не опрашивались, не имеют значения
+        probed = self._last_seen > 0
+        if column == COL_DELIVERED:
+            return np.where(probed, self._delivered, np.nan)
+        if column == COL_LOSS:
+            return np.where(probed, self._loss, np.nan)
+        return np.where(probed, self._last_seen, np.nan)
+
+    def _allocate_slots(self, hosts):
+        # Сначала переиспользуются освобожденные слоты, затем выделяются новые
+        reused = min(len(hosts), len(self._free))
+        slots = [self._free.pop() for _ in range(reused)]
+        for slot, host in zip(slots, hosts):
+            self._hosts[slot] = host
+
+        start = len(self._hosts)
+        self._hosts.extend(hosts[reused:])
+        slots.extend(range(start, len(self._hosts)))
+        self._ensure_capacity(len(self._hosts))
+
+        self._slot_of.update(zip(hosts, slots))
+        self._rtt[slots] = np.nan
+        self._delivered[slots] = 0.0
+        self._loss[slots] = 0.0
+        self._last_seen[slots] = 0.0
+        self._overhead[slots] = np.nan
+        self.stats.reset(slots)
+        return slots
+
+    def _release_slot(self, slot):
+        del self._slot_of[self._hosts[slot]]
+        self._hosts[slot] = None
+        self._free.append(slot)
+
+    def _ensure_capacity(self, size):
+        capacity = len(self._rtt)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2, 1024)
+        for name in ("_rtt", "_delivered", "_loss", "_last_seen", "_overhead", "_row_of"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        self.stats.ensure_capacity(capacity)
+
+
+class TableSnapshot:
+    """
+    Неизменяемая копия таблицы: массивы уже переставлены в порядок строк.
+
+    Модель в это время может меняться, поэтому снимок можно отдавать
+    фоновому потоку экспорта.
+    """
+
+    def __init__(self, headers, hosts, rtt, delivered, loss, last_seen, stats):
+        self.headers = headers
+        self.hosts = hosts
+        self._rtt = rtt
+        self._delivered = delivered
+        self._loss = loss
+        self._last_seen = last_seen
+        self._stats = stats
+
+    def __len__(self):
+        return len(self.hosts)
+
+    def rows(self, start: int, stop: int) -> List[List[str]]:
+        """Отображаемые значения строк [start, stop)"""
+        rows = []
+        for row in range(start, min(stop, len(self.hosts))):
+            texts = [self.hosts[row]]
+            texts.extend(
+                _cell_text(col, self._rtt[row], self._delivered[row], self._loss[row], self._last_seen[row])
+                for col in range(COL_RTT, len(COLUMNS))
+            )
+            texts.extend(_stat_text(value) for value in self._stats[row])
+            rows.append(texts)
+        return rows
+
+
+def _stat_text(value) -> str:
+    return "n/a" if np.isnan(value) else f"{value:.1f}"
+
+
+def _rtt_text(rtt) -> str:
+    # Доли миллисекунды важны для близких хостов, для дальних хватает десятых
+    if rtt < 10:
+        return f"{rtt:.3f}"
+    return f"{rtt:.1f}"
+
+
+def _cell_text(col, rtt, delivered, loss, last_seen) -> str:
+    if col == COL_LAST_PING:
+        if not last_seen:
+            return "00:00:00"
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last_seen))
+
+    if not last_seen or np.isnan(rtt):
+        return "n/a"
+    if col == COL_RTT:
+        return _rtt_text(rtt)
+    if col == COL_DELIVERED:
+        return f"{delivered}%"
+    return f"{loss}%"
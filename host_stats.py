@@ -0,0 +1,289 @@
+import math
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+# Окна статистики по умолчанию, секунды
+DEFAULT_WINDOWS = (60, 900, 3600)
+# Длительность корзины для длинных окон, секунды
+BUCKET_SECONDS = 60
+PERCENTILES = (50, 95, 99)
+
+
+def window_label(seconds: int) -> str:
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600} ч"
+    if seconds % 60 == 0:
+        return f"{seconds // 60} мин"
+    return f"{seconds} с"
+
+
+def raw_samples_for(window: float, interval: float, count: int = 1, minimum: int = 64) -> int:
+    """Размер кольца пакетов, которого хватает на окно при проверке раз в interval сериями по count"""
+    return max(minimum, math.ceil(window / interval) * count + 1)
+
+
+class HostStats:
+    """
+    Скользящая статистика RTT по всем хостам.
+
+    Память на хост фиксирована и состоит из двух колец:
+    - raw_samples последних пакетов (RTT float32, NaN — потеря, и время
+      отправки). По ним считаются min/avg/max, джиттер, перцентили и потери
+      для самого короткого окна, поэтому кольцо должно вмещать все пакеты
+      этого окна (raw_samples_for);
+    - минутные корзины (отправлено, получено, сумма, минимум и максимум RTT)
+      на длительность самого длинного окна. По ним считаются потери и
+      min/avg/max для остальных окон с точностью до минуты.
+
+    Хосты адресуются номерами слотов; слоты выдает владелец (модель таблицы).
+    Запись выполняется инкрементально, пересчет — одним векторным проходом
+    по хостам, получившим новые пакеты.
+    """
+
+    def __init__(self, raw_samples: int = 64, windows: Sequence[int] = DEFAULT_WINDOWS):
+        self.raw_samples = raw_samples
+        self.windows = tuple(sorted(windows))
+        self.buckets = -(-self.windows[-1] // BUCKET_SECONDS) + 1  # +1 на текущую неполную минуту
+
+        short = window_label(self.windows[0])
+        self.columns = [
+            ("min", f"Мин {short}, мс"),
+            ("avg", f"Сред {short}, мс"),
+            ("max", f"Макс {short}, мс"),
+            ("jitter", f"Джиттер {short}, мс"),
+        ]
+        self.columns += [(f"p{q}", f"p{q} {short}, мс") for q in PERCENTILES]
+        self.columns += [(f"loss_{w}", f"Потери {window_label(w)}, %") for w in self.windows]
+        self._column_index = {name: i for i, (name, _) in enumerate(self.columns)}
+
+        self._capacity = 0
+        self._allocate(0)
+
+    # --- Память ---
+
+    def ensure_capacity(self, size: int):
+        if size > self._capacity:
+            self._allocate(size)
+
+    def reset(self, slots):
+        """Очистка истории слотов (при выдаче слота новому хосту)"""
+        slots = np.asarray(slots, dtype=np.int64)
+        self._raw_rtt[slots] = np.nan
+        self._raw_ts[slots] = 0
+        self._head[slots] = 0
+        self._bucket_minute[slots] = -1
+        self._bucket_sent[slots] = 0
+        self._bucket_received[slots] = 0
+        self._bucket_sum[slots] = 0
+        self._bucket_min[slots] = np.nan
+        self._bucket_max[slots] = np.nan
+        self.values[slots] = np.nan
+        self._dirty[slots] = False
+        self._version[slots] += 1
+
+    def column(self, name: str) -> np.ndarray:
+        """Посчитанные значения статистики по слотам"""
+        return self.values[:, self._column_index[name]]
+
+    def version(self, slot: int) -> int:
+        """Меняется при каждой записи и сбросе слота; по ней кэшируются производные от истории"""
+        return self._version[slot]
+
+    def minute_history(self, slot: int, now: Optional[float] = None):
+        """
+        Минутные корзины хоста за самое длинное окно в хронологическом
+        порядке: (минимумы RTT, максимумы RTT, доля потерь). Минута без
+        ответов дает NaN в минимуме и максимуме, без пакетов — еще и 0 потерь.
+        """
+        now = time.time() if now is None else now
+        current = int(now // BUCKET_SECONDS)
+        minutes = np.arange(current - self.buckets + 1, current + 1)
+        index = minutes % self.buckets
+        valid = self._bucket_minute[slot, index] == minutes
+        sent = np.where(valid, self._bucket_sent[slot, index], 0)
+        received = np.where(valid, self._bucket_received[slot, index], 0)
+        answered = received > 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            lost = np.where(sent > 0, (sent - received) / sent, 0)
+        return (
+            np.where(answered, self._bucket_min[slot, index], np.nan).astype(np.float32),
+            np.where(answered, self._bucket_max[slot, index], np.nan).astype(np.float32),
+            lost.astype(np.float32),
+        )
+
+    # --- Запись ---
+
+    def record(self, slots, timestamps, rtts):
+        """
+        Запись пакетов: слот хоста, время (epoch) и RTT в мс (NaN — потеря).
+
+        Слоты в пачке могут повторяться — тогда запись идет в несколько
+        проходов, чтобы пакеты одного хоста не перезаписывали друг друга.
+        """
+        slots = np.asarray(slots, dtype=np.int64)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        rtts = np.asarray(rtts, dtype=np.float32)
+
+        while len(slots):
+            unique, first = np.unique(slots, return_index=True)
+            if len(unique) == len(slots):
+                self._record_unique(slots, timestamps, rtts)
+                break
+            self._record_unique(slots[first], timestamps[first], rtts[first])
+            rest = np.ones(len(slots), dtype=bool)
+            rest[first] = False
+            slots, timestamps, rtts = slots[rest], timestamps[rest], rtts[rest]
+
+    def _record_unique(self, slots, timestamps, rtts):
+        # Кольцо последних пакетов
+        head = self._head[slots]
+        self._raw_rtt[slots, head] = rtts
+        self._raw_ts[slots, head] = timestamps
+        self._head[slots] = (head + 1) % self.raw_samples
+
+        # Минутные корзины: устаревшая корзина обнуляется перед записью
+        minutes = (timestamps // BUCKET_SECONDS).astype(np.int64)
+        bucket = minutes % self.buckets
+        stale = self._bucket_minute[slots, bucket] != minutes
+        if stale.any():
+            s, b = slots[stale], bucket[stale]
+            self._bucket_minute[s, b] = minutes[stale]
+            self._bucket_sent[s, b] = 0
+            self._bucket_received[s, b] = 0
+            self._bucket_sum[s, b] = 0
+            self._bucket_min[s, b] = np.nan
+            self._bucket_max[s, b] = np.nan
+
+        alive = ~np.isnan(rtts)
+        self._bucket_sent[slots, bucket] += 1
+        self._bucket_received[slots, bucket] += alive
+        s, b, r = slots[alive], bucket[alive], rtts[alive]
+        self._bucket_sum[s, b] += r
+        self._bucket_min[s, b] = np.fmin(self._bucket_min[s, b], r)
+        self._bucket_max[s, b] = np.fmax(self._bucket_max[s, b], r)
+
+        self._dirty[slots] = True
+        self._version[slots] += 1
+
+    # --- Расчет ---
+
+    def refresh(self, now: Optional[float] = None) -> np.ndarray:
+        """Пересчет статистики для хостов с новыми пакетами, возвращает их слоты"""
+        slots = np.flatnonzero(self._dirty)
+        if not len(slots):
+            return slots
+        now = time.time() if now is None else now
+
+        short = self._raw_stats(slots, self.windows[0], now)
+        for name in ("min", "avg", "max", "jitter"):
+            self.values[slots, self._column_index[name]] = short[name]
+        for q in PERCENTILES:
+            self.values[slots, self._column_index[f"p{q}"]] = short[f"p{q}"]
+
+        self.values[slots, self._column_index[f"loss_{self.windows[0]}"]] = short["loss"]
+        for window in self.windows[1:]:
+            self.values[slots, self._column_index[f"loss_{window}"]] = \
+                self._bucket_stats(slots, window, now)["loss"]
+
+        self._dirty[slots] = False
+        return slots
+
+    def window_stats(self, slots, window: int, now: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Статистика произвольного окна: короткое — по пакетам, длинные — по корзинам"""
+        slots = np.asarray(slots, dtype=np.int64)
+        now = time.time() if now is None else now
+        if window <= self.windows[0]:
+            return self._raw_stats(slots, window, now)
+        return self._bucket_stats(slots, window, now)
+
+    def _raw_stats(self, slots, window, now):
+        # Пакеты в хронологическом порядке: кольцо разворачивается от head
+        order = (self._head[slots, None] + np.arange(self.raw_samples)) % self.raw_samples
+        rtt = np.take_along_axis(self._raw_rtt[slots], order, axis=1)
+        ts = np.take_along_axis(self._raw_ts[slots], order, axis=1)
+
+        in_window = ts >= now - window
+        sent = in_window.sum(axis=1)
+        rtt = np.where(in_window, rtt, np.nan)
+        valid = ~np.isnan(rtt)
+        received = valid.sum(axis=1)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            stats = {
+                "min": np.where(valid, rtt, np.inf).min(axis=1),
+                "max": np.where(valid, rtt, -np.inf).max(axis=1),
+                "avg": np.where(valid, rtt, 0).sum(axis=1) / received,
+                "loss": (sent - received) / sent * 100,
+            }
+        no_data = received == 0
+        stats["min"][no_data] = np.nan
+        stats["max"][no_data] = np.nan
+
+        # Перцентили: NaN при сортировке уходят в конец строки
+        ordered = np.sort(rtt, axis=1)
+        last = np.maximum(received - 1, 0)
+        rows = np.arange(len(slots))
+        for q in PERCENTILES:
+            position = last * (q / 100)
+            low = np.floor(position).astype(np.int64)
+            high = np.minimum(low + 1, last)
+            fraction = position - low
+            value = ordered[rows, low] * (1 - fraction) + ordered[rows, high] * fraction
+            value[no_data] = np.nan
+            stats[f"p{q}"] = value
+
+        # Джиттер: среднее модуля разности соседних успешных пакетов
+        positions = np.where(valid, np.arange(self.raw_samples), -1)
+        previous = np.maximum.accumulate(positions, axis=1)
+        previous = np.concatenate((np.full((len(slots), 1), -1), previous[:, :-1]), axis=1)
+        has_previous = valid & (previous >= 0)
+        diffs = np.abs(rtt - np.take_along_axis(rtt, np.maximum(previous, 0), axis=1))
+        pairs = has_previous.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            stats["jitter"] = np.where(has_previous, diffs, 0).sum(axis=1) / pairs
+
+        return stats
+
+    def _bucket_stats(self, slots, window, now):
+        current = int(now // BUCKET_SECONDS)
+        oldest = current - window // BUCKET_SECONDS
+        minute = self._bucket_minute[slots]
+        in_window = (minute > oldest) & (minute <= current)
+
+        sent = np.where(in_window, self._bucket_sent[slots], 0).sum(axis=1)
+        received = np.where(in_window, self._bucket_received[slots], 0).sum(axis=1)
+        total = np.where(in_window, self._bucket_sum[slots], 0).sum(axis=1)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {
+                "min": np.fmin.reduce(np.where(in_window, self._bucket_min[slots], np.nan), axis=1),
+                "max": np.fmax.reduce(np.where(in_window, self._bucket_max[slots], np.nan), axis=1),
+                "avg": total / received,
+                "loss": (sent - received) / sent * 100,
+            }
+
+    def _allocate(self, size):
+        size = max(size, self._capacity * 2) if size else 0
+        old = self._capacity
+
+        def grow(name, shape_tail, dtype, fill):
+            new = np.full((size,) + shape_tail, fill, dtype=dtype)
+            if old:
+                new[:old] = getattr(self, name)
+            setattr(self, name, new)
+
+        grow("_raw_rtt", (self.raw_samples,), np.float32, np.nan)
+        grow("_raw_ts", (self.raw_samples,), np.float64, 0)
+        grow("_head", (), np.int64, 0)
+        grow("_bucket_minute", (self.buckets,), np.int32, -1)
+        grow("_bucket_sent", (self.buckets,), np.uint16, 0)
+        grow("_bucket_received", (self.buckets,), np.uint16, 0)
+        grow("_bucket_sum", (self.buckets,), np.float32, 0)
+        grow("_bucket_min", (self.buckets,), np.float32, np.nan)
+        grow("_bucket_max", (self.buckets,), np.float32, np.nan)
+        grow("values", (len(self.columns),), np.float32, np.nan)
+        grow("_dirty", (), bool, False)
+        grow("_version", (), np.int64, 0)
+        self._capacity = size
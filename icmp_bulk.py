@@ -0,0 +1,315 @@
+import asyncio
+import collections
+import os
+import socket
+import struct
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from tracing import TRACER
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+# Полезная нагрузка запроса: постоянная, поэтому ее сумма считается один раз
+PAYLOAD = b"hosts_checker\x00\x00\x00"
+_HEADER = struct.Struct("!BBHHH")
+
+
+def _ones_sum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\x00"
+    return sum(struct.unpack(f"!{len(data) // 2}H", data))
+
+
+_PAYLOAD_SUM = _ones_sum(PAYLOAD)
+
+# Метка времени приема от ядра (Linux): struct timespec по CLOCK_REALTIME
+# в служебных данных recvmsg. В модуле socket константы нет, значение из <asm/socket.h>
+SO_TIMESTAMPNS = getattr(socket, "SO_TIMESTAMPNS", 35 if sys.platform.startswith("linux") else None)
+_TIMESPEC = struct.Struct("@ll")
+_ANCILLARY_SIZE = socket.CMSG_SPACE(_TIMESPEC.size) if hasattr(socket, "CMSG_SPACE") else 0
+
+
+def echo_request(identifier: int, sequence: int) -> bytes:
+    """Пакет ICMP Echo Request; контрольная сумма досчитывается от суммы нагрузки"""
+    total = (ICMP_ECHO_REQUEST << 8) + identifier + sequence + _PAYLOAD_SUM
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return _HEADER.pack(ICMP_ECHO_REQUEST, 0, ~total & 0xFFFF, identifier, sequence) + PAYLOAD
+
+
+class _Pending:
+    __slots__ = ("address", "sent", "sent_wall", "future")
+
+    def __init__(self, address, sent, sent_wall, future):
+        self.address = address
+        self.sent = sent  # time.monotonic_ns()
+        self.sent_wall = sent_wall  # time.time_ns(), для сравнения с меткой ядра
+        self.future = future
+
+
+class BulkPinger:
+    """
+    Опрос множества адресов через один общий ICMP-сокет.
+
+    Без привилегий используется датаграммный ICMP-сокет (Linux, macOS;
+    на Linux нужен доступ по net.ipv4.ping_group_range), с привилегиями —
+    raw-сокет. Все ожидающие ответа запросы хранятся в одной таблице по
+    номеру последовательности; ответы разбираются обработчиком чтения
+    сокета в цикле событий, таймауты снимает одна фоновая задача.
+
+    Номер последовательности 16-битный, поэтому одновременно ожидается
+    не больше 65535 ответов на сокет.
+
+    Время отправки берется по time.monotonic_ns непосредственно перед
+    системным вызовом. Время приема, если ядро поддерживает
+    SO_TIMESTAMPNS, — метка ядра, поставленная при получении пакета,
+    поэтому в RTT не попадает ожидание пакета в буфере сокета, пока цикл
+    событий занят или ждет GIL. Это ожидание возвращается отдельно как
+    накладные расходы измерения. Без меток ядра RTT считается по
+    monotonic_ns в момент разбора ответа, а накладные расходы неизвестны.
+    """
+
+    MAX_PENDING = 0xFFFF
+
+    def __init__(self, timeout: float = 1.0, privileged: bool = False):
+        self.timeout = timeout
+        self.privileged = privileged
+
+        self._sock = None
+        self._loop = None
+        self._identifier = os.getpid() & 0xFFFF
+        self._sequence = 0
+        self._pending: Dict[int, _Pending] = {}
+        self._deadlines = collections.deque()  # (срок, номер, запрос) в порядке отправки
+        self._sweeper = None
+        self._sweep_wakeup = None
+        self.kernel_timestamps = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def open(self):
+        """Открытие сокета; OSError — нет прав или поддержки ICMP-сокетов,
+        NotImplementedError — цикл событий не поддерживает add_reader"""
+        kind = socket.SOCK_RAW if self.privileged else socket.SOCK_DGRAM
+        sock = socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP)
+        sock.setblocking(False)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+        except OSError:
+            pass
+        self.kernel_timestamps = False
+        if SO_TIMESTAMPNS is not None and _ANCILLARY_SIZE:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+                self.kernel_timestamps = True
+            except OSError:
+                pass
+
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_reader(sock.fileno(), self._on_readable)
+        except BaseException:
+            # NotImplementedError — цикл без add_reader (Proactor в Windows)
+            sock.close()
+            raise
+        self._sock = sock
+        self._loop = loop
+        self._sweep_wakeup = asyncio.Event()
+        self._sweeper = self._loop.create_task(self._sweep())
+
+    async def close(self):
+        if self._sock is None:
+            return
+        self._loop.remove_reader(self._sock.fileno())
+        self._sweeper.cancel()
+        await asyncio.gather(self._sweeper, return_exceptions=True)
+        for pending in self._pending.values():
+            if not pending.future.done():
+                pending.future.cancel()
+        self._pending.clear()
+        self._deadlines.clear()
+        self._sock.close()
+        self._sock = None
+
+    async def ping(self, address: str) -> Optional[Tuple[float, Optional[float]]]:
+        """
+        Один запрос к адресу: (RTT, накладные расходы) в миллисекундах или
+        None по таймауту. Накладные расходы — время от приема пакета ядром
+        до его разбора; None, если меток ядра нет.
+
+        Ошибки отправки (сеть недоступна и т. п.) — OSError.
+        """
+        sequence, pending = await self._send(address)
+        try:
+            return await pending.future
+        finally:
+            self._forget(sequence, pending)
+
+    async def ping_burst(self, address: str, count: int, spacing: float,
+                         slots: Optional[asyncio.Semaphore] = None) -> List[Optional[Tuple[float, Optional[float]]]]:
+        """
+        Серия из count запросов с промежутком spacing секунд: ответы
+        (как у ping) по порядку отправки.
+
+        Следующий запрос уходит по расписанию, не дожидаясь ответа на
+        предыдущий. Если отправка прервалась ошибкой, в списке только
+        отправленные запросы; ошибка на первом запросе — OSError.
+
+        slots — семафор одновременных запросов, одно место в котором уже
+        занял вызывающий. Место занято только до ответа (или таймаута) на
+        каждый запрос; в паузах между запросами серии оно свободно, и
+        освобождает его сама серия.
+        """
+        sent = []
+        holding = slots is not None  # Место под первый запрос занято вызывающим
+        try:
+            for number in range(count):
+                if number:
+                    await asyncio.sleep(spacing)
+                    if slots is not None:
+                        await slots.acquire()
+                        holding = True
+                try:
+                    sequence, pending = await self._send(address)
+                except OSError:
+                    if not sent:
+                        raise
+                    break
+                sent.append((sequence, pending))
+                if slots is not None:
+                    pending.future.add_done_callback(lambda _: slots.release())
+                    holding = False
+            return [await pending.future for _, pending in sent]
+        finally:
+            if holding:
+                slots.release()
+            for sequence, pending in sent:
+                self._forget(sequence, pending)
+
+    async def _send(self, address: str) -> Tuple[int, _Pending]:
+        sequence = self._next_sequence()
+        future = self._loop.create_future()
+        packet = echo_request(self._identifier, sequence)
+
+        sent = time.monotonic_ns()
+        pending = _Pending(address, sent, time.time_ns(), future)
+        self._pending[sequence] = pending
+        try:
+            try:
+                # Обычно буфер свободен и пакет уходит сразу, без корутины цикла событий
+                self._sock.sendto(packet, (address, 0))
+            except (BlockingIOError, InterruptedError):
+                await self._loop.sock_sendto(self._sock, packet, (address, 0))
+        except BaseException:
+            self._pending.pop(sequence, None)
+            raise
+
+        self._deadlines.append((sent + int(self.timeout * 1e9), sequence, pending))
+        if len(self._deadlines) == 1:
+            self._sweep_wakeup.set()
+        return sequence, pending
+
+    def _forget(self, sequence: int, pending: _Pending):
+        if self._pending.get(sequence) is pending:
+            del self._pending[sequence]
+
+    def _next_sequence(self) -> int:
+        if len(self._pending) >= self.MAX_PENDING:
+            raise OSError("Превышено число одновременных запросов на ICMP-сокет")
+        sequence = self._sequence
+        while True:
+            sequence = (sequence + 1) & 0xFFFF
+            if sequence not in self._pending:
+                self._sequence = sequence
+                return sequence
+
+    def _on_readable(self):
+        started = time.perf_counter_ns()
+        replies = self._read_replies()
+        if TRACER.enabled:
+            TRACER.complete("icmp_read", started, cat="icmp", args={"replies": replies})
+
+    def _read_replies(self) -> int:
+        # За одно пробуждение разбираются все накопившиеся ответы
+        replies = 0
+        sock = self._sock
+        kernel_timestamps = self.kernel_timestamps
+        while True:
+            kernel_received = None
+            try:
+                if kernel_timestamps:
+                    data, ancillary, _, (address, _) = sock.recvmsg(2048, _ANCILLARY_SIZE)
+                    kernel_received = _kernel_timestamp(ancillary)
+                else:
+                    data, (address, _) = sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return replies
+            except OSError:
+                # Ошибки ICMP (например, недоступность) приходят в сокет;
+                # запрос завершится по таймауту
+                continue
+            received = time.monotonic_ns()
+
+            if self.privileged:
+                # Raw-сокет отдает пакет вместе с IP-заголовком
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < _HEADER.size:
+                continue
+            kind, _, _, identifier, sequence = _HEADER.unpack_from(data)
+            if kind != ICMP_ECHO_REPLY:
+                continue
+            # Датаграммному сокету идентификатор назначает ядро и само
+            # фильтрует чужие ответы, raw-сокет видит ответы всех процессов
+            if self.privileged and identifier != self._identifier:
+                continue
+
+            pending = self._pending.get(sequence)
+            if pending is None or pending.address != address or pending.future.done():
+                continue
+            del self._pending[sequence]
+            pending.future.set_result(_measure(pending, received, kernel_received))
+            replies += 1
+
+    async def _sweep(self):
+        deadlines = self._deadlines
+        while True:
+            if not deadlines:
+                self._sweep_wakeup.clear()
+                await self._sweep_wakeup.wait()
+                continue
+
+            now = time.monotonic_ns()
+            while deadlines and deadlines[0][0] <= now:
+                _, sequence, pending = deadlines.popleft()
+                if self._pending.get(sequence) is pending:
+                    del self._pending[sequence]
+                if not pending.future.done():
+                    pending.future.set_result(None)
+            if deadlines:
+                await asyncio.sleep((deadlines[0][0] - now) / 1e9)
+
+
+def _kernel_timestamp(ancillary) -> Optional[int]:
+    """Метка приема из служебных данных recvmsg, нс по CLOCK_REALTIME"""
+    for level, kind, data in ancillary:
+        if level == socket.SOL_SOCKET and kind == SO_TIMESTAMPNS and len(data) >= _TIMESPEC.size:
+            seconds, nanoseconds = _TIMESPEC.unpack_from(data)
+            return seconds * 1_000_000_000 + nanoseconds
+    return None
+
+
+def _measure(pending: _Pending, received: int, kernel_received: Optional[int]):
+    """(RTT, накладные расходы) в мс по монотонным часам и метке ядра"""
+    rtt = received - pending.sent
+    if kernel_received is not None:
+        kernel_rtt = kernel_received - pending.sent_wall
+        # Перевод системных часов между отправкой и приемом дает
+        # невозможное значение — тогда остается монотонное измерение
+        if 0 <= kernel_rtt <= rtt:
+            return kernel_rtt / 1e6, (rtt - kernel_rtt) / 1e6
+    return rtt / 1e6, None
@@ -1,12 +1,13 @@
-import platform
-import subprocess
+import os
 import sys
-import csv
 import time
+import signal
+import argparse
+from collections import deque
 
-from PyQt6.QtGui import QStandardItem, QStandardItemModel, QBrush, QColor
 from PyQt6.QtWidgets import (
     QApplication,
+    QDialog,
     QMainWindow,
     QWidget,
     QVBoxLayout,
@@ -14,79 +15,154 @@ from PyQt6.QtWidgets import (
     QFrame,
     QPushButton,
     QTableView,
-    QTextEdit,
+    QPlainTextEdit,
+    QComboBox,
+    QLabel,
     QFileDialog,
     QMessageBox, QHeaderView, QSplitter
 )
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from host_adder import HostAddDialog, is_valid_ip  # Импортируем диалог из модуля
-
-from icmplib import ping, exceptions
-
-
-class PingThread(QThread):
-    data_ready = pyqtSignal(str, dict)  # (hostname, {metrics})
-    error_occurred = pyqtSignal(str, str)  # (hostname, error message)
-    status_update = pyqtSignal(str)  # Новый сигнал для статуса
-
-    def __init__(self, host):
+from PyQt6.QtCore import (
+    Qt,
+    QObject,
+    QTimer,
+    pyqtSignal
+)
+from PyQt6.QtGui import QTextCursor
+import metrics
+from host_adder import HostAddDialog, ImportWorker, start_import, report_import  # Импортируем диалог из модуля
+from history_store import HistoryStore
+from host_model import HostTableModel
+from host_stats import DEFAULT_WINDOWS, HostStats, raw_samples_for
+from sparkline import SparklineDelegate
+from status_log import StatusLog, DEBUG, INFO, WARNING, ERROR, LEVEL_NAMES
+from tracing import TRACER
+
+
+# Период применения накопленных результатов к таблице, мс
+UI_TICK_MS = 200
+# Период обновления журнала статуса, мс
+LOG_TICK_MS = 500
+# Период пересчета скользящей статистики, мс
+STATS_TICK_MS = 1000
+# Файл истории опроса
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.sqlite3")
+# Снимок сеанса: хосты, последние метрики и раскладка столбцов
+SESSION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "session.bin")
+# Каталог трассировок, сохраненных по сигналу SIGUSR1
+TRACE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class ProbeBridge(QObject):
+    """
+    Единый канал доставки результатов движка опроса в GUI-поток.
+
+    Рабочий поток только складывает результаты в очередь (и в очередь
+    записи истории), а таймер GUI-потока раз в UI_TICK_MS забирает их
+    одной пачкой. Если задан адрес агрегатора, хосты опрашивают
+    удаленные исполнители, а результаты приходят от агрегатора.
+    """
+    results_ready = pyqtSignal(list)  # [ProbeResult, ...]
+
+    def __init__(self, history_store: HistoryStore = None, aggregator: str = None, engine_options: dict = None):
         super().__init__()
-        self.host = host
-        self.running = True
+        self._pending = deque()
+        self.history_store = history_store
+        self.aggregator = aggregator
+        self.engine_options = engine_options or {}
+        self._engine = None
+        self._options = {}  # Настройки из снимка сеанса до создания движка
+        self._trace_flow = 0  # Стрелка трассировки от первого результата пачки
+
+        metrics.PENDING_RESULTS.set_function(lambda: len(self._pending))
+        if history_store is not None:
+            metrics.HISTORY_BACKLOG.set_function(lambda: history_store.backlog)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(UI_TICK_MS)
+        self._timer.timeout.connect(self._flush)
+        self._timer.start()
+
+    @property
+    def engine(self):
+        # Движок создается при первом обращении: asyncio и icmplib не нужны для первой отрисовки
+        if self._engine is None:
+            if self.aggregator:
+                from cluster import RemoteProbeEngine
+
+                self._engine = RemoteProbeEngine(self.aggregator, on_result=self._on_result)
+            else:
+                from probe_engine import ProbeEngine
+
+                self._engine = ProbeEngine(on_result=self._on_result, **self.engine_options)
+                self._apply_options(self._options)
+        return self._engine
+
+    @property
+    def running(self) -> bool:
+        return self._engine is not None and self._engine.running
 
     def stop(self):
-        self.running = False
-
-    def run(self):
-        while self.running:  # Исправлено: runn ing → running
-            try:
-                result = ping(self.host, count=1, timeout=1, privileged=False)
-
-                # Отправка статуса о успешном пинге
-                rtt_ms = result.avg_rtt * 1000
-                self.status_update.emit(f"Пинг {self.host} выполнен. RTT: {rtt_ms:.1f} ms")
-
-                if result.is_alive:
-                    rtt = int(rtt_ms)  # Исправлено: avg_rtt * 1000
-                    loss_percent = round(result.packet_loss * 100, 2)  # Исправлено: 10 0 → 100
-                    delivered = round((result.packets_received / result.packets_sent) * 100, 2)
-                else:
-                    rtt = None
-                    loss_percent = '100%'
-                    delivered = '0%'
-
-                metrics = {
-                    "rtt": rtt,
-                    "delivered": delivered,  # Исправлено: deliv ered → delivered
-                    "loss": loss_percent,
-                    "last_ping": time.strftime("%Y-%m-%d %H:%M:%S")
-                }
-
-                self.data_ready.emit(self.host, metrics)  # Исправлено: e mit → emit
-
-            except exceptions.ICMPTimeout:
-                error_msg = f"Ошибка пинга {self.host}: Время ожидания ответа истекло"
-                self.status_update.emit(error_msg)
-                self.error_occurred.emit(self.host, "Время ожидания ответа истекло")
-
-            except exceptions.NameLookupError:
-                error_msg = f"Ошибка пинга {self.host}: Не удалось разрешить имя хоста"
-                self.status_update.emit(error_msg)
-                self.error_occurred.emit(self.host, "Не удалось разрешить имя хоста")
-
-            except Exception as e:
-                error_msg = f"Ошибка пинга {self.host}: {str(e)}"
-                self.status_update.emit(error_msg)
-                self.error_occurred.emit(self.host, str(e))
-
-            time.sleep(1)
+        if self._engine is not None:
+            self._engine.stop()
+
+    def session_options(self) -> dict:
+        """Настройки опроса хостов и групп для снимка сеанса"""
+        scheduler = getattr(self._engine, "scheduler", None)
+        if scheduler is None:
+            return self._options
+        return {
+            "hosts": {
+                host: [options.interval, options.priority, options.group]
+                for host, options in scheduler.host_options().items()
+            },
+            "groups": scheduler.group_intervals(),
+        }
+
+    def restore_options(self, options: dict):
+        # До первого запуска настройки только запоминаются, движок не создается
+        if self._engine is None:
+            self._options = options
+        else:
+            self._apply_options(options)
+
+    def _apply_options(self, options: dict):
+        if not hasattr(self._engine, "configure_host"):
+            return  # Удаленным исполнителям настройки не передаются
+        for group, interval in options.get("groups", {}).items():
+            self._engine.set_group_interval(group, interval)
+        for host, (interval, priority, group) in options.get("hosts", {}).items():
+            self._engine.configure_host(host, interval, priority, group)
+
+    def _on_result(self, result):
+        # Вызывается из рабочего потока движка
+        if TRACER.enabled and not self._trace_flow:
+            # Отметка в потоке движка, от которой идет стрелка к обработке пачки
+            with TRACER.span("enqueue", "bridge", host=result.host):
+                self._trace_flow = TRACER.flow_start("results", "bridge")
+        self._pending.append(result)
+        if self.history_store is not None:
+            self.history_store.add(result)
+
+    def _flush(self):
+        if not self._pending:
+            return
+        flow, self._trace_flow = self._trace_flow, 0
+        batch = []
+        try:
+            while True:
+                batch.append(self._pending.popleft())
+        except IndexError:
+            pass
+        with TRACER.span("flush", "gui", results=len(batch)):
+            TRACER.flow_end("results", flow, "bridge")
+            self.results_ready.emit(batch)
 
 
 class TopFrame(QFrame):
-    def __init__(self, table_model, status_text):
+    def __init__(self, table_model, status_log):
         super().__init__()
         self.table_model = table_model
-        self.status_text = status_text
+        self.status_log = status_log
         self.init_ui()
 
     def init_ui(self):
@@ -97,12 +173,15 @@ class TopFrame(QFrame):
 
 
 class FileActionsFrame(QFrame):
-    def __init__(self, table_model: QStandardItemModel, status_text: QTextEdit):
+    def __init__(self, table_model: HostTableModel, status_log: StatusLog,
+                 history_store: HistoryStore = None):
         super().__init__()
         self.btn_import = None
         self.btn_export = None
+        self.btn_export_history = None
         self.table_model = table_model
-        self.status_text = status_text
+        self.status_log = status_log
+        self.history_store = history_store
         self.init_ui()
 
     def init_ui(self):
@@ -116,35 +195,40 @@ class FileActionsFrame(QFrame):
         self.btn_import.clicked.connect(self.import_from_csv)
         layout.addWidget(self.btn_import)
 
+        if self.history_store is not None:
+            self.btn_export_history = QPushButton("История")
+            self.btn_export_history.setToolTip("Экспорт истории опроса за период")
+            self.btn_export_history.clicked.connect(self.export_history)
+            layout.addWidget(self.btn_export_history)
+
         layout.setAlignment(Qt.AlignmentFlag.AlignTop|Qt.AlignmentFlag.AlignHCenter)
         self.setLayout(layout)
 
 # Перенесенные методы из TopFrame
     def export_to_csv(self):
         try:
-            file_name, _ = QFileDialog.getSaveFileName(
-                self,
-                "Сохранить CSV",
-                "",
-                "CSV Files (*.csv);;All Files (*)"
-            )
-            if file_name:
-                with open(file_name, 'w', encoding='utf-8-sig', newline='') as f:
-                    writer = csv.writer(f, delimiter=';')
-                    headers = [self.table_model.headerData(i, Qt.Orientation.Horizontal)
-                               for i in range(self.table_model.columnCount())]
-                    writer.writerow(headers)
-
-                    for row in range(self.table_model.rowCount()):
-                        row_data = []
-                        for col in range(self.table_model.columnCount()):
-                            item = self.table_model.item(row, col)
-                            row_data.append(item.text() if item else "")
-                        writer.writerow(row_data)
-                self.status_text.append(f"Экспорт в {file_name} завершен")
+            from host_exporter import start_export, table_export_worker
+
+            # Запись идет в фоновом потоке из снимка таблицы
+            worker = table_export_worker(self, self.table_model)
+            if worker is not None:
+                start_export(self, worker, self._on_export_done)
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", str(e))
 
+    def export_history(self):
+        from host_exporter import HistoryExportDialog, start_export
+
+        dialog = HistoryExportDialog(self.history_store, self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        worker = dialog.export_worker()
+        if worker is not None:
+            start_export(self, worker, self._on_export_done)
+
+    def _on_export_done(self, file_name, count):
+        self.status_log.info(f"Экспорт в {file_name} завершен: {count} строк")
+
     def import_from_csv(self):
         try:
             file_name, _ = QFileDialog.getOpenFileName(
@@ -154,46 +238,52 @@ class FileActionsFrame(QFrame):
                 "CSV Files (*.csv);;All Files (*)"
             )
             if file_name:
-                with open(file_name, 'r', encoding='utf-8-sig') as f:
-                    reader = csv.reader(f, delimiter=';')
-                    next(reader)  # Пропуск заголовков
-                    for row in reader:
-                        if not row[0]:
-                            continue
-
-                        if is_valid_ip(row[0]):
-                            self.table_model.appendRow([
-                                QStandardItem(row[0]),
-                                QStandardItem("0"),
-                                QStandardItem("0"),
-                                QStandardItem("0"),
-                                QStandardItem("00:00:00")
-                            ])
-                        else:
-                            self.status_text.append(f"Ошибка: {row[0]} — неверный формат IP")
-
-                self.status_text.append(f"Импорт из {file_name} завершен")
+                # Чтение и разворачивание идут в фоновом потоке
+                worker = ImportWorker(self.table_model.hosts(), file_name=file_name, parent=self)
+                start_import(self, worker, lambda hosts, invalid, duplicates:
+                             self._on_import_done(file_name, hosts, invalid, duplicates))
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", str(e))
 
+    def _on_import_done(self, file_name, hosts, invalid, duplicates):
+        # Все строки добавляются в модель одной вставкой
+        added = self.table_model.add_hosts(hosts)
+        report_import(self.status_log, added, invalid, duplicates)
+        self.status_log.info(f"Импорт из {file_name} завершен")
+
 
 class MiddleFrame(QFrame):
-    def __init__(self, table_model: QStandardItemModel, status_text: QTextEdit):
+    def __init__(self, table_model: HostTableModel, status_log: StatusLog,
+                 history_store: HistoryStore = None, aggregator: str = None, engine_options: dict = None):
         super().__init__()
         self.btn_monitor = None
         self.btn_add = None
+        self.btn_sparkline = None
         self.table_view = None
         self.table_model = table_model
-        self.status_text = status_text
-        self.ping_threads = []
+        self.status_log = status_log
+
+        # Движок опроса: один рабочий поток на все хосты
+        self.probe_bridge = ProbeBridge(history_store, aggregator, engine_options)
+        self.probe_bridge.results_ready.connect(self.handle_results)
+
+        # Добавленные и удаленные хосты сразу меняют состав работающего опроса
+        self.table_model.rowsInserted.connect(self._on_rows_inserted)
+        self.table_model.rowsAboutToBeRemoved.connect(self._on_rows_about_to_be_removed)
+
+        # Скользящая статистика пересчитывается одним проходом по таймеру
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(STATS_TICK_MS)
+        self.stats_timer.timeout.connect(self.refresh_stats)
+        self.stats_timer.start()
 
         # Создаем экземпляр FileActionsFrame с передачей данных
         self.file_actions = FileActionsFrame(
             table_model=self.table_model,
-            status_text=self.status_text
+            status_log=self.status_log,
+            history_store=history_store
         )
 
-        # Для хранения активных потоков
         self.init_ui()
 
     def init_ui(self):
@@ -218,10 +308,17 @@ class MiddleFrame(QFrame):
         self.btn_monitor.setFixedWidth(200)
         self.btn_monitor.clicked.connect(self.toggle_monitoring)
         buttons_layout.addWidget(self.btn_monitor)
+
+        self.btn_sparkline = QPushButton("График RTT")
+        self.btn_sparkline.setFixedWidth(200)
+        self.btn_sparkline.setCheckable(True)
+        self.btn_sparkline.setToolTip("Столбец с историей RTT и потерь по последним пакетам")
+        self.btn_sparkline.toggled.connect(self.table_model.set_sparkline_visible)
+        buttons_layout.addWidget(self.btn_sparkline)
         buttons_layout.addWidget(self.file_actions)
 
         # Таблица
-        self.table_view = QTableView()
+        self.table_view = HostTableView()
 
         # Настройка внешнего вида таблицы
         self.table_view.horizontalHeader().setSectionResizeMode(
@@ -242,6 +339,9 @@ class MiddleFrame(QFrame):
         self.table_view.setAlternatingRowColors(True)
 
         self.table_view.setModel(self.table_model)
+        # График рисуется делегатом только для видимых ячеек
+        self.table_view.setItemDelegateForColumn(
+            self.table_model.sparkline_column(), SparklineDelegate(self.table_view))
         layout.addWidget(self.table_view)
         layout.addLayout(buttons_layout)
 
@@ -250,108 +350,68 @@ class MiddleFrame(QFrame):
     def toggle_monitoring(self):
         if self.btn_monitor.text() == "Наблюдение":
             # Запуск наблюдения
-            # Проверка и исправление данных в таблице
-            self.fix_table_columns()  # Новый метод для проверки
-
             self.start_monitoring()
         else:
             # Остановка наблюдения
             self.stop_monitoring()
 
-    def fix_table_columns(self):
-        """Исправление таблицы: добавление недостающих столбцов в строки"""
-        required_columns = 5  # Количество столбцов в модели
-        rows = self.table_model.rowCount()
-        cols = self.table_model.columnCount()  # Общее количество столбцов модели
-
-        # Убедимся, что модель имеет правильное количество столбцов
-        if cols < required_columns:
-            # Добавляем недостающие столбцы (если нужно)
-            for _ in range(required_columns - cols):
-                self.table_model.insertColumn(cols)
-                cols += 1
-
-        # Исправляем каждую строку
-        for row in range(rows):
-            for col in range(required_columns):
-                if not self.table_model.item(row, col):
-                    # Если элемент отсутствует — добавляем пустой
-                    self.table_model.setItem(row, col, QStandardItem())
-
     def start_monitoring(self):
-        # Очистка старых потоков
+        # Остановка предыдущего опроса
         self.stop_monitoring()
 
-        # Запуск потоков для всех хостов
-        self.ping_threads = []
-        for row in range(self.table_model.rowCount()):
-            host = self.table_model.item(row, 0).text()
-            thread = PingThread(host)
-            thread.data_ready.connect(self.update_metrics)
-            thread.error_occurred.connect(self.handle_ping_error)
-            thread.status_update.connect(self.update_status)
-
-            thread.start()
-            self.ping_threads.append(thread)
+        self.probe_bridge.engine.start(self.table_model.hosts())
 
         self.btn_monitor.setText("Остановить наблюдение")
 
     def stop_monitoring(self):
-        # Отправляем сигнал остановки
-        for thread in self.ping_threads:
-            thread.stop()
-
-        # Ждем 0.5 секунд, чтобы потоки завершились
-        for thread in self.ping_threads:
-            if thread.isRunning():
-                thread.quit()
-                thread.wait(500)  # Таймаут 0.5 секунды
-
-            # Принудительное завершение, если нужно
-            if thread.isRunning():
-                thread.terminate()
-
-        self.ping_threads.clear()
+        self.probe_bridge.stop()
         self.btn_monitor.setText("Наблюдение")
 
-    def update_metrics(self, host, metrics):
-        """Обновление таблицы с метриками и цветовой индикацией"""
-        for row in range(self.table_model.rowCount()):
-            current_host = self.table_model.item(row, 0).text()
-            if current_host == host:
-                # Определяем цвет в зависимости от статуса
-                if metrics["rtt"] is not None:
-                    # Успешный пинг
-                    color = QColor("green")
-                else:
-                    # Проблемы с пингом
-                    color = QColor("red")
+    def _on_rows_inserted(self, parent, first, last):
+        if self.probe_bridge.running:
+            self.probe_bridge.engine.add_hosts(self.table_model.host_at(row) for row in range(first, last + 1))
 
-                rtf = str(metrics["rtt"]) if metrics["rtt"] else "n/a"
-                delivered_text = f"{metrics['delivered']}%" if metrics["rtt"] else "n/a"
-                loss_text = f"{metrics['loss']}%" if metrics["rtt"] else "n/a"
-
-                self.table_model.item(row, 1).setText(rtf)
-                self.table_model.item(row, 1).setForeground(color)
+    def _on_rows_about_to_be_removed(self, parent, first, last):
+        if self.probe_bridge.running:
+            self.probe_bridge.engine.remove_hosts(
+                self.table_model.host_at(row) for row in range(first, last + 1)
+            )
 
-                self.table_model.item(row, 2).setText(delivered_text)
-                self.table_model.item(row, 2).setForeground(color)
+    def handle_results(self, results):
+        """Обработка пачки результатов из движка опроса"""
+        # Строки об успешных пингах формируются, только если уровень DEBUG включен
+        log_success = self.status_log.enabled_for(DEBUG)
+        with TRACER.span("handle_results", "gui"):
+            for result in results:
+                if result.is_alive:
+                    if log_success:
+                        self.update_status(f"Пинг {result.host} выполнен. RTT: {result.rtt:.1f} ms", DEBUG)
+                else:
+                    self.handle_ping_error(result.host, result.error)
 
-                self.table_model.item(row, 3).setText(loss_text)
-                self.table_model.item(row, 3).setForeground(color)
+        self.update_metrics(results)
 
-                self.table_model.item(row, 4).setText(metrics["last_ping"])
-                self.table_model.item(row, 4).setForeground(color)
+    def update_metrics(self, results):
+        """Обновление таблицы с метриками одной пачкой"""
+        started = time.perf_counter()
+        with TRACER.span("update_metrics", "gui", results=len(results)):
+            self.table_model.apply_results(results)
+        metrics.UPDATE_METRICS_SECONDS.observe(time.perf_counter() - started)
 
-                break
+    def refresh_stats(self):
+        with TRACER.span("refresh_stats", "gui"):
+            self.table_model.refresh_stats()
 
     def handle_ping_error(self, host: str, error: str):
-        self.status_text.append(f"Ошибка при пинге {host}: {error}")
+        # Повторяющиеся ошибки хоста сворачиваются в одну запись со счетчиком
+        started = time.perf_counter()
+        self.status_log.error(error, host=host)
+        metrics.UPDATE_STATUS_SECONDS.observe(time.perf_counter() - started)
 
     def show_add_dialog(self):
-        dialog = HostAddDialog(self.table_model, self.status_text)
+        dialog = HostAddDialog(self.table_model, self.status_log)
         if dialog.exec() == HostAddDialog.accepted:
-            self.status_text.append("Диалог добавления закрыт успешно")
+            self.status_log.info("Диалог добавления закрыт успешно")
 
     def keyPressEvent(self, event):
         """Обработка нажатия клавиш."""
@@ -367,7 +427,7 @@ class MiddleFrame(QFrame):
 
         try:
             current_row = selected_indexes[0].row()
-            host_text = self.table_model.item(current_row, 0).text()
+            host_text = self.table_model.host_at(current_row)
 
             confirmation = QMessageBox.question(
                 self,
@@ -377,18 +437,89 @@ class MiddleFrame(QFrame):
             )
 
             if confirmation == QMessageBox.StandardButton.Yes:
-                self.table_model.removeRow(current_row)
+                self.table_model.remove_rows([current_row])
         except Exception as e:
             print(f"Ошибка при удалении записи: {e}")
 
-    def update_status(self, message):
-        self.status_text.append(f"[{time.strftime('%H:%M:%S')}] {message}")
+    def update_status(self, message, level=INFO):
+        started = time.perf_counter()
+        self.status_log.log(level, message)
+        metrics.UPDATE_STATUS_SECONDS.observe(time.perf_counter() - started)
+
+
+class HostTableView(QTableView):
+    """Таблица хостов; время отрисовки попадает в трассировку"""
+
+    def paintEvent(self, event):
+        with TRACER.span("repaint", "gui"):
+            super().paintEvent(event)
+
+
+class StatusLogView(QPlainTextEdit):
+    """
+    Отображение журнала статуса.
+
+    Обновляется по таймеру пачкой: новые записи дописываются в конец,
+    у записей с новым счетчиком повторов заменяется только их строка.
+    Полная перерисовка нужна только после очистки журнала.
+    """
+
+    def __init__(self, status_log: StatusLog):
+        super().__init__()
+        self.status_log = status_log
+        self._appended = 0
+        self._revision = 0
+        self._cleared = 0
+
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.setMaximumBlockCount(status_log.capacity)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(LOG_TICK_MS)
+        self._timer.timeout.connect(self.refresh)
+        self._timer.start()
+
+    def refresh(self):
+        log = self.status_log
+        if log.appended == self._appended and log.revision == self._revision:
+            return
+        with TRACER.span("status_log_refresh", "gui"):
+            self._refresh()
+
+    def _refresh(self):
+        log = self.status_log
+        scrollbar = self.verticalScrollBar()
+        at_bottom = scrollbar.value() == scrollbar.maximum()
+        position = scrollbar.value()
+
+        if log.cleared != self._cleared:
+            self._cleared = log.cleared
+            lines, self._appended, self._revision = log.snapshot()
+            self.setPlainText("\n".join(lines))
+        else:
+            document = self.document()
+            # Номер записи в первой строке; пустой документ — один пустой блок
+            shown = document.blockCount() if not document.isEmpty() else 0
+            first = self._appended - shown
+            lines, updated, self._appended, self._revision = log.changes_since(self._appended, self._revision)
+            for number, line in updated:
+                if number >= first:
+                    cursor = QTextCursor(document.findBlockByNumber(number - first))
+                    cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock, QTextCursor.MoveMode.KeepAnchor)
+                    cursor.insertText(line)
+            if lines:
+                self.appendPlainText("\n".join(lines))
+
+        scrollbar.setValue(scrollbar.maximum() if at_bottom else position)
 
 
 class BottomFrame(QFrame):
-    def __init__(self, status_text):
+    def __init__(self, status_log: StatusLog):
         super().__init__()
-        self.status_text = status_text
+        self.status_log = status_log
+        self.status_view = StatusLogView(status_log)
+        self.level_combo = None
         self.init_ui()
 
     def init_ui(self):
@@ -399,34 +530,50 @@ class BottomFrame(QFrame):
         # Настройка ширины рамки
         self.setLineWidth(1)
 
+        # Выбор минимального уровня сообщений журнала
+        self.level_combo = QComboBox()
+        for level in (DEBUG, INFO, WARNING, ERROR):
+            self.level_combo.addItem(LEVEL_NAMES[level], level)
+        self.level_combo.setCurrentIndex(self.level_combo.findData(self.status_log.level))
+        self.level_combo.currentIndexChanged.connect(self.change_level)
+
+        level_layout = QVBoxLayout()
+        level_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
+        level_layout.addWidget(QLabel("Уровень журнала"))
+        level_layout.addWidget(self.level_combo)
+
         layout = QHBoxLayout()
-        layout.addWidget(self.status_text)
+        layout.addWidget(self.status_view)
+        layout.addLayout(level_layout)
         self.setLayout(layout)
 
+    def change_level(self, index):
+        self.status_log.level = self.level_combo.itemData(index)
+
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, aggregator: str = None, engine_options: dict = None):
         super().__init__()
         self.setWindowTitle("Network Monitor")
         self.setGeometry(100, 100, 800, 600)
 
-        self.table_model = QStandardItemModel()
-        self.table_model.setColumnCount(5)
-        self.table_model.setHorizontalHeaderLabels([
-            "Хост",
-            "Ping, мс",
-            "% доставленных",
-            "% недоставленных",
-            "Время последнего ping"
-        ])
+        # Кольцо пакетов статистики покрывает короткое окно и при сериях из нескольких пакетов
+        engine_options = engine_options or {}
+        raw_samples = raw_samples_for(DEFAULT_WINDOWS[0], engine_options.get("interval", 1.0),
+                                      engine_options.get("count", 1))
+        self.table_model = HostTableModel(stats=HostStats(raw_samples))
 
-        self.status_text = QTextEdit()
-        self.status_text.setReadOnly(True)
+        # Успешные пинги пишутся с уровнем DEBUG и по умолчанию не попадают в журнал
+        self.status_log = StatusLog(capacity=2000, level=INFO)
+
+        # История опроса пишется на диск в фоновом потоке
+        self.history_store = HistoryStore(HISTORY_PATH)
 
         main_layout = QVBoxLayout()
-        self.top_frame = TopFrame(self.table_model, self.status_text)
-        self.middle_frame = MiddleFrame(self.table_model, self.status_text)
-        self.bottom_frame = BottomFrame(self.status_text)
+        self.top_frame = TopFrame(self.table_model, self.status_log)
+        self.middle_frame = MiddleFrame(self.table_model, self.status_log, self.history_store, aggregator,
+                                        engine_options)
+        self.bottom_frame = BottomFrame(self.status_log)
 
         main_layout.addWidget(self.top_frame)
 
@@ -442,9 +589,116 @@ class MainWindow(QMainWindow):
         central_widget.setLayout(main_layout)
         self.setCentralWidget(central_widget)
 
+        self.init_menu()
+        self.restore_session()
+
+    def init_menu(self):
+        debug_menu = self.menuBar().addMenu("Отладка")
+
+        self.trace_action = debug_menu.addAction("Трассировка")
+        self.trace_action.setCheckable(True)
+        self.trace_action.setChecked(TRACER.enabled)
+        self.trace_action.setToolTip("Запись событий обработки результатов в кольцевой буфер")
+        self.trace_action.toggled.connect(self.set_tracing)
+
+        save_action = debug_menu.addAction("Сохранить трассировку...")
+        save_action.triggered.connect(self.save_trace)
+
+    def set_tracing(self, enabled: bool):
+        if enabled:
+            TRACER.enable()
+            self.status_log.info(f"Трассировка включена (буфер на {TRACER.capacity} событий)")
+        else:
+            TRACER.disable()
+            self.status_log.info("Трассировка выключена")
+
+    def save_trace(self):
+        file_name, _ = QFileDialog.getSaveFileName(
+            self, "Сохранить трассировку", "", "Chrome Trace (*.json);;All Files (*)")
+        if file_name:
+            self.write_trace(file_name)
+
+    def dump_trace(self):
+        """Сохранение трассировки без диалога (по сигналу SIGUSR1)"""
+        self.write_trace(os.path.join(TRACE_DIR, time.strftime("trace-%Y%m%d-%H%M%S.json")))
+
+    def write_trace(self, file_name: str):
+        from host_exporter import ExportWorker, start_export
+
+        if not len(TRACER):
+            self.status_log.warning("Буфер трассировки пуст: включите Отладка → Трассировка")
+            return
+        # Буфер копируется в GUI-потоке, запись в файл идет в фоновом потоке
+        snapshot = TRACER.snapshot()
+        worker = ExportWorker(
+            lambda target, on_progress, is_cancelled: snapshot.save(target, on_progress, is_cancelled),
+            file_name, self
+        )
+        start_export(self, worker, lambda name, count:
+                     self.status_log.info(f"Трассировка сохранена в {name}: {count} событий"))
+
+    def restore_session(self):
+        """Восстановление хостов, метрик и столбцов из снимка прошлого сеанса"""
+        from session import load_session
+
+        session = load_session(SESSION_PATH)
+        if session is None:
+            return
+        try:
+            self.table_model.restore_state(session.hosts, session.columns)
+            self.middle_frame.probe_bridge.restore_options(session.options)
+            self.middle_frame.btn_sparkline.setChecked(session.options.get("view", {}).get("sparkline", False))
+            if session.header:
+                self.middle_frame.table_view.horizontalHeader().restoreState(session.header)
+        finally:
+            session.close()
+
+    def save_session(self):
+        from session import save_session
+
+        hosts, columns = self.table_model.state()
+        header = self.middle_frame.table_view.horizontalHeader().saveState()
+        options = dict(self.middle_frame.probe_bridge.session_options())
+        options["view"] = {"sparkline": self.table_model.sparkline_visible()}
+        try:
+            save_session(SESSION_PATH, hosts, columns, options, header.data())
+        except OSError as e:
+            print(f"Не удалось сохранить сеанс: {e}", file=sys.stderr)
+
+    def closeEvent(self, event):
+        self.middle_frame.stop_monitoring()
+        self.save_session()
+        self.history_store.close()
+        super().closeEvent(event)
+
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = MainWindow()
+    parser = argparse.ArgumentParser(description="Network Monitor")
+    parser.add_argument("--aggregator", help="адрес агрегатора распределенного опроса (хост:порт)")
+    parser.add_argument("--metrics-port", type=int,
+                        help="порт HTTP-точки /metrics на 127.0.0.1 (формат Prometheus)")
+    parser.add_argument("--count", type=int, default=1,
+                        help="пакетов в серии на каждую проверку (потери и джиттер по серии)")
+    parser.add_argument("--burst-interval", type=float, default=0.2, help="промежуток между пакетами серии, с")
+    parser.add_argument("--bulk", action="store_true",
+                        help="все запросы через один общий ICMP-сокет; RTT по меткам времени ядра")
+    parser.add_argument("--privileged", action="store_true", help="использовать raw-сокеты")
+    parser.add_argument("--trace", action="store_true",
+                        help="включить трассировку с запуска (сохранение — меню Отладка или SIGUSR1)")
+    args, qt_args = parser.parse_known_args()
+
+    if args.metrics_port:
+        metrics.MetricsServer(args.metrics_port)
+    if args.trace:
+        TRACER.enable()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    window = MainWindow(args.aggregator, {
+        "count": args.count, "burst_interval": args.burst_interval,
+        "bulk": args.bulk, "privileged": args.privileged,
+    })
+    if hasattr(signal, "SIGUSR1"):
+        # Обработчик сигнала только ставит сохранение в очередь событий Qt
+        signal.signal(signal.SIGUSR1, lambda *_: QTimer.singleShot(0, window.dump_trace))
     window.show()
     sys.exit(app.exec())
@@ -0,0 +1,215 @@
+"""
+Внутренние метрики приложения в текстовом формате Prometheus.
+
+Счетчики и гистограммы потокобезопасны и обновляются всегда; HTTP-точка
+/metrics поднимается только по запросу (--metrics-port) и слушает
+127.0.0.1. Метрики не делятся по хостам: на десятках тысяч хостов это
+дало бы столько же временных рядов, поэтому отклонение интервала
+собирается в одну гистограмму по всем хостам.
+"""
+import bisect
+import math
+import os
+import sys
+import threading
+from typing import Callable, List, Optional
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def rss_bytes() -> int:
+    """Текущая резидентная память процесса"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        # Вне Linux доступен только пик; на macOS он в байтах, иначе в КБ
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name} {_format_value(value)}" for name, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text)
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        return [(self.name, self.value)]
+
+
+class Gauge(Metric):
+    """Значение задается через set() или вычисляется функцией при каждом опросе"""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, function: Optional[Callable[[], float]] = None):
+        super().__init__(name, help_text)
+        self.value = 0
+        self.function = function
+
+    def set(self, value: float):
+        self.value = value
+
+    def set_function(self, function: Optional[Callable[[], float]]):
+        self.function = function
+
+    def samples(self):
+        value = self.value
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception:
+                value = float("nan")
+        return [(self.name, value)]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets: List[float]):
+        super().__init__(name, help_text)
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # Последняя корзина — +Inf
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def samples(self):
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        result, cumulative = [], 0
+        for bound, bucket_count in zip(self.buckets + [float("inf")], counts):
+            cumulative += bucket_count
+            result.append((f'{self.name}_bucket{{le="{_format_value(bound)}"}}', cumulative))
+        result.append((f"{self.name}_sum", total))
+        result.append((f"{self.name}_count", count))
+        return result
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+_LATENCY_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+
+PROBES_SENT = REGISTRY.register(Counter(
+    "hosts_checker_probes_sent_total", "Отправленные проверки"))
+PROBES_SUCCEEDED = REGISTRY.register(Counter(
+    "hosts_checker_probes_succeeded_total", "Проверки с ответом"))
+PROBES_TIMED_OUT = REGISTRY.register(Counter(
+    "hosts_checker_probes_timed_out_total", "Проверки без ответа за таймаут"))
+PROBES_FAILED = REGISTRY.register(Counter(
+    "hosts_checker_probes_failed_total", "Проверки, завершившиеся ошибкой до отправки"))
+PROBE_INTERVAL_RATIO = REGISTRY.register(Histogram(
+    "hosts_checker_probe_interval_ratio",
+    "Отношение фактического интервала между проверками хоста к назначенному",
+    [0.5, 0.9, 0.95, 1.0, 1.05, 1.1, 1.25, 1.5, 2.0, 5.0]))
+MEASUREMENT_OVERHEAD_SECONDS = REGISTRY.register(Histogram(
+    "hosts_checker_measurement_overhead_seconds",
+    "Задержка разбора ответа после приема ядром (исключена из RTT)",
+    [0.00001, 0.00005, 0.0001] + _LATENCY_BUCKETS))
+ENGINE_TASKS = REGISTRY.register(Gauge(
+    "hosts_checker_engine_tasks", "Проверки, выполняющиеся в движке опроса"))
+PENDING_RESULTS = REGISTRY.register(Gauge(
+    "hosts_checker_pending_results", "Результаты, ожидающие передачи в GUI-поток"))
+HISTORY_BACKLOG = REGISTRY.register(Gauge(
+    "hosts_checker_history_backlog", "Результаты в очереди записи истории"))
+UPDATE_METRICS_SECONDS = REGISTRY.register(Histogram(
+    "hosts_checker_update_metrics_seconds", "Время обработки пачки результатов таблицей", _LATENCY_BUCKETS))
+UPDATE_STATUS_SECONDS = REGISTRY.register(Histogram(
+    "hosts_checker_update_status_seconds", "Время записи сообщения в журнал статуса", _LATENCY_BUCKETS))
+THREADS = REGISTRY.register(Gauge(
+    "hosts_checker_threads", "Потоки процесса", threading.active_count))
+RESIDENT_MEMORY = REGISTRY.register(Gauge(
+    "hosts_checker_resident_memory_bytes", "Резидентная память процесса", rss_bytes))
+
+
+def _make_handler(registry: Registry):
+    # http.server нужен только при включенной точке, импорт не замедляет запуск
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Запросы сборщика метрик не засоряют вывод
+
+    return Handler
+
+
+class MetricsServer:
+    """HTTP-точка /metrics в фоновом потоке"""
+
+    def __init__(self, port: int, host: str = "127.0.0.1", registry: Registry = REGISTRY):
+        from http.server import ThreadingHTTPServer
+
+        self._server = ThreadingHTTPServer((host, port), _make_handler(registry))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
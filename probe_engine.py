@@ -0,0 +1,391 @@
+import asyncio
+import math
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional
+
+from icmplib import async_ping, exceptions
+
+import metrics
+from icmp_bulk import BulkPinger
+from resolver import ResolverCache
+from scheduler import ProbeScheduler
+from tracing import TRACER
+
+# Через сколько секунд повторить проверку хоста, имя которого еще разрешается
+RESOLVE_RETRY = 0.2
+# Сколько проверок диспетчер запускает подряд, не отдавая управление циклу событий
+DISPATCH_BATCH = 500
+
+
+@dataclass
+class ProbeResult:
+    """Результат одной проверки хоста"""
+    host: str
+    timestamp: float  # Время проверки (epoch, секунды)
+    rtt: Optional[float] = None  # Среднее RTT в миллисекундах, None если ответа нет
+    packets_sent: int = 0
+    packets_received: int = 0
+    error: Optional[str] = None
+    # Задержка разбора ответа после приема ядром, мс; не входит в rtt.
+    # Известна только при опросе через BulkPinger с метками времени ядра
+    overhead: Optional[float] = None
+    # Серия из нескольких пакетов: разброс RTT полученных ответов, мс
+    rtt_min: Optional[float] = None
+    rtt_max: Optional[float] = None
+    jitter: Optional[float] = None  # Среднее модуля разности соседних RTT, нужно от двух ответов
+    rtts: Optional[List[float]] = None  # RTT полученных ответов в порядке отправки
+
+    @property
+    def is_alive(self) -> bool:
+        return self.packets_received > 0
+
+    @property
+    def delivered(self) -> float:
+        if not self.packets_sent:
+            return 0.0
+        return round(self.packets_received / self.packets_sent * 100, 2)
+
+    @property
+    def loss(self) -> float:
+        if not self.packets_sent:
+            return 100.0
+        return round(100 - self.delivered, 2)
+
+    def packet_rtts(self) -> List[float]:
+        """RTT каждого отправленного пакета (NaN — потеря) для статистики по пакетам"""
+        if self.rtts is not None:
+            received = list(self.rtts)
+        else:
+            # Без RTT отдельных пакетов (например, от агрегатора) берется среднее
+            received = [self.rtt] * self.packets_received if self.rtt is not None else []
+        return received + [math.nan] * (self.packets_sent - len(received))
+
+
+def burst_result(host: str, sent: int, rtts: List[float]) -> ProbeResult:
+    """Итог серии: отправлено sent пакетов, rtts — RTT полученных ответов по порядку"""
+    result = ProbeResult(host, time.time(), packets_sent=sent, packets_received=len(rtts))
+    if not rtts:
+        result.error = "Время ожидания ответа истекло"
+        return result
+    result.rtts = rtts
+    result.rtt = sum(rtts) / len(rtts)
+    result.rtt_min = min(rtts)
+    result.rtt_max = max(rtts)
+    if len(rtts) > 1:
+        result.jitter = sum(abs(b - a) for a, b in zip(rtts, rtts[1:])) / (len(rtts) - 1)
+    return result
+
+
+class ProbeEngine:
+    """
+    Движок опроса хостов: один поток, один цикл событий asyncio.
+
+    Когда проверять каждый хост, решает планировщик ProbeScheduler;
+    единственная корутина-диспетчер забирает из него наступившие проверки
+    и запускает их как задачи, одновременное число запросов ограничено
+    семафором. Результаты передаются через единственный канал — функцию
+    on_result, которая вызывается из рабочего потока.
+
+    Имена хостов разрешаются заранее через ResolverCache: проверка уходит
+    только на уже известный адрес, а хост с неразрешенным пока именем
+    откладывается.
+
+    В режиме bulk все запросы идут через один общий ICMP-сокет
+    (BulkPinger) вместо отдельного сокета icmplib на каждую проверку.
+
+    Проверка — серия из count пакетов с промежутком burst_interval. Пакеты
+    серии не ждут ответов друг друга, а серии разных хостов идут
+    одновременно, поэтому цикл опроса длится примерно одну серию:
+    (count - 1) * burst_interval + время ответа. В режиме bulk место в
+    семафоре занято только в ожидании ответа на каждый пакет, а не всю
+    серию. Без bulk каждый пакет серии — отдельный однопакетный запрос
+    icmplib со своим сокетом (сам icmplib отправляет следующий пакет
+    только после ответа на предыдущий); место занято до конца серии, и
+    на него приходится до count сокетов одновременно.
+    """
+
+    def __init__(self, on_result: Callable[[ProbeResult], None],
+                 concurrency: int = 1000, interval: float = 1.0,
+                 timeout: float = 1.0, privileged: bool = False,
+                 scheduler: ProbeScheduler = None, resolver: ResolverCache = None,
+                 bulk: bool = False, count: int = 1, burst_interval: float = 0.2):
+        self.on_result = on_result
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.privileged = privileged
+        self.bulk = bulk
+        self.count = max(1, count)
+        self.burst_interval = burst_interval
+        self.scheduler = scheduler if scheduler is not None else ProbeScheduler(interval)
+        self.resolver = resolver if resolver is not None else ResolverCache()
+
+        self._thread = None
+        self._loop = None
+        self._main_task = None
+        self._wakeup = None
+        self._pinger = None
+        self._pinger_error = None
+        self._last_started = {}  # Хост → время запуска последней проверки
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def interval(self) -> float:
+        return self.scheduler.interval
+
+    def start(self, hosts: Iterable[str]):
+        if self.running:
+            self.stop()
+
+        hosts = list(dict.fromkeys(hosts))  # Убираем дубликаты, сохраняя порядок
+        ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(hosts, ready), name="ProbeEngine", daemon=True
+        )
+        self._thread.start()
+        ready.wait()
+
+    def stop(self, timeout: float = 1.0):
+        if self._loop is not None and self._main_task is not None:
+            self._loop.call_soon_threadsafe(self._main_task.cancel)
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def add_hosts(self, hosts: Iterable[str]):
+        """Добавление хостов в работающий опрос без перезапуска"""
+        hosts = list(dict.fromkeys(hosts))
+        if hosts:
+            self._post(self._add_hosts, hosts)
+
+    def remove_hosts(self, hosts: Iterable[str]):
+        """Исключение хостов из работающего опроса; их текущие проверки не сообщаются"""
+        hosts = list(hosts)
+        if hosts:
+            self._post(self._remove_hosts, hosts)
+
+    def configure_host(self, host: str, interval: Optional[float] = None,
+                       priority: Optional[int] = None, group: Optional[str] = None):
+        """Индивидуальный интервал, приоритет или группа хоста"""
+        self._call(self.scheduler.configure, host, interval, priority, group)
+
+    def set_group_interval(self, group: str, interval: float):
+        self._call(self.scheduler.set_group_interval, group, interval)
+
+    def _call(self, func, *args):
+        # Планировщик принадлежит циклу событий: при работающем движке
+        # изменения передаются в рабочий поток
+        loop = self._loop
+        if loop is not None and self.running:
+            loop.call_soon_threadsafe(func, *args)
+        else:
+            func(*args)
+
+    def _post(self, func, *args):
+        # Без работающего движка менять нечего: start() получит полный список
+        loop = self._loop
+        if loop is not None and self.running:
+            try:
+                loop.call_soon_threadsafe(func, *args)
+            except RuntimeError:
+                pass  # Цикл событий уже закрыт
+
+    def _add_hosts(self, hosts):
+        self.scheduler.add_many(hosts, time.monotonic())
+        self.resolver.prefetch(hosts)
+        # Диспетчер может спать до далекой проверки — будим его
+        self._wakeup.set()
+
+    def _remove_hosts(self, hosts):
+        for host in hosts:
+            self.scheduler.remove(host)
+            self.resolver.forget(host)
+            self._last_started.pop(host, None)
+
+    def _run(self, hosts, ready: threading.Event):
+        loop = self._loop = asyncio.new_event_loop()
+        try:
+            self._main_task = loop.create_task(self._main(hosts))
+            ready.set()
+            loop.run_until_complete(self._main_task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            ready.set()
+            loop.close()
+            # Если остановка не уложилась в таймаут, движок мог быть уже перезапущен
+            if self._loop is loop:
+                self._loop = None
+                self._main_task = None
+
+    async def _main(self, hosts):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        self._wakeup = asyncio.Event()
+        tasks = set()
+
+        scheduler = self.scheduler
+        scheduler.clear()
+        self._last_started.clear()
+        scheduler.add_many(hosts, time.monotonic())
+        self.resolver.prefetch(hosts)
+        if self.bulk:
+            await self._open_pinger()
+        try:
+            while True:
+                due = scheduler.pop_due(time.monotonic(), DISPATCH_BATCH)
+                for entry in due:
+                    self._observe_interval(entry)
+                    address, error = self.resolver.lookup(entry.host)
+                    if address is None:
+                        self._unresolved(entry.host, error)
+                        continue
+
+                    # При исчерпании лимита диспетчер ждет освобождения места
+                    await semaphore.acquire()
+                    task = asyncio.create_task(self._probe_scheduled(entry.host, address, semaphore))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                metrics.ENGINE_TASKS.set(len(tasks))
+                if len(due) == DISPATCH_BATCH:
+                    # Отставание: ответы и отмена обрабатываются между пачками запусков
+                    await asyncio.sleep(0)
+                    continue
+
+                next_due = scheduler.next_due()
+                delay = 1.0 if next_due is None else next_due - time.monotonic()
+                if delay > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            tasks.update(self.resolver.detach())
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self._pinger is not None:
+                await self._pinger.close()
+                self._pinger = None
+
+    async def _open_pinger(self):
+        pinger = BulkPinger(self.timeout, self.privileged)
+        try:
+            pinger.open()
+        except OSError as e:
+            # Ошибка выдается в результате каждой проверки, как и без bulk
+            self._pinger_error = f"Нет доступа к ICMP-сокету: {e}"
+        except NotImplementedError:
+            # Цикл без add_reader (Proactor в Windows): опрос идет через icmplib
+            print("Общий ICMP-сокет не поддерживается циклом событий, режим bulk отключен",
+                  file=sys.stderr)
+            self.bulk = False
+        else:
+            self._pinger, self._pinger_error = pinger, None
+
+    async def _probe_scheduled(self, host: str, address: str, semaphore: asyncio.Semaphore):
+        trace_id = TRACER.begin_async("probe", "engine", host=host)
+        try:
+            if self.bulk and self.count > 1 and self._pinger is not None:
+                # Место освобождает сама серия: между пакетами оно нужно другим хостам
+                result = await self._probe_bulk(host, address, semaphore)
+            else:
+                try:
+                    result = await self._probe(host, address)
+                finally:
+                    semaphore.release()
+        except Exception as e:
+            # Непредвиденная ошибка считается потерей серии: хост остается
+            # в расписании и перепланируется, как после таймаута
+            result = ProbeResult(host, time.time(), packets_sent=self.count,
+                                 error=f"Ошибка проверки: {type(e).__name__}: {e}")
+        TRACER.end_async("probe", trace_id, "engine", rtt=result.rtt)
+        if host in self.scheduler:
+            self.scheduler.complete(host, result.is_alive, time.monotonic())
+            self._emit(result)
+
+    def _observe_interval(self, entry):
+        now = time.monotonic()
+        last = self._last_started.get(entry.host)
+        self._last_started[entry.host] = now
+        if last is not None and entry.interval > 0:
+            metrics.PROBE_INTERVAL_RATIO.observe((now - last) / entry.interval)
+
+    def _unresolved(self, host: str, error: Optional[str]):
+        now = time.monotonic()
+        if error is None:
+            # Имя еще разрешается: это не неудача хоста
+            self.scheduler.postpone(host, RESOLVE_RETRY, now)
+            return
+        self.scheduler.complete(host, False, now)
+        self._emit(ProbeResult(host, time.time(), error=error))
+
+    async def _probe(self, host: str, address: str) -> ProbeResult:
+        if self.bulk:
+            return await self._probe_bulk(host, address)
+        try:
+            if self.count == 1:
+                replies = [await self._ping_once(address)]
+            else:
+                replies = await asyncio.gather(*(
+                    self._ping_once(address, number * self.burst_interval) for number in range(self.count)
+                ), return_exceptions=True)
+                errors = [reply for reply in replies if isinstance(reply, Exception)]
+                # Пакеты, которые не удалось отправить, не считаются отправленными
+                replies = [reply for reply in replies if not isinstance(reply, Exception)]
+                if not replies:
+                    raise errors[0]
+        except exceptions.NameLookupError:
+            return ProbeResult(host, time.time(), error="Не удалось разрешить имя хоста")
+        except (exceptions.ICMPLibError, OSError) as e:
+            return ProbeResult(host, time.time(), error=str(e))
+
+        return burst_result(host, len(replies), [rtt for rtt in replies if rtt is not None])
+
+    async def _ping_once(self, address: str, delay: float = 0.0) -> Optional[float]:
+        """Один пакет через icmplib после задержки delay: RTT в мс или None по таймауту"""
+        if delay:
+            await asyncio.sleep(delay)
+        reply = await async_ping(address, count=1, timeout=self.timeout, privileged=self.privileged)
+        return reply.rtts[0] if reply.packets_received else None
+
+    async def _probe_bulk(self, host: str, address: str,
+                          slots: Optional[asyncio.Semaphore] = None) -> ProbeResult:
+        if self._pinger is None:
+            return ProbeResult(host, time.time(), error=self._pinger_error)
+        try:
+            if self.count == 1:
+                replies = [await self._pinger.ping(address)]
+            else:
+                replies = await self._pinger.ping_burst(address, self.count, self.burst_interval, slots)
+        except OSError as e:
+            return ProbeResult(host, time.time(), error=str(e))
+
+        answered = [reply for reply in replies if reply is not None]
+        overheads = [overhead for _, overhead in answered if overhead is not None]
+        result = burst_result(host, len(replies), [rtt for rtt, _ in answered])
+        if overheads:
+            result.overhead = sum(overheads) / len(overheads)
+        return result
+
+    def _emit(self, result: ProbeResult):
+        if not result.packets_sent:
+            metrics.PROBES_FAILED.inc()
+        else:
+            metrics.PROBES_SENT.inc()
+            if result.is_alive:
+                metrics.PROBES_SUCCEEDED.inc()
+                if result.overhead is not None:
+                    metrics.MEASUREMENT_OVERHEAD_SECONDS.observe(result.overhead / 1000)
+            else:
+                metrics.PROBES_TIMED_OUT.inc()
+        try:
+            self.on_result(result)
+        except Exception as e:
+            # Ошибка получателя не должна останавливать опрос
+            print(f"Ошибка обработки результата {result.host}: {e}", file=sys.stderr)
@@ -0,0 +1,141 @@
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+import zlib
+from typing import Callable, Iterable, List
+
+from probe_engine import ProbeEngine, ProbeResult
+from scheduler import ProbeScheduler
+
+# Как часто процесс-исполнитель передает накопленные результаты
+BATCH_INTERVAL = 0.05
+
+
+def shard_of(host: str, shards: int) -> int:
+    """Номер исполнителя хоста; не зависит от порядка и состава списка"""
+    return zlib.crc32(host.encode()) % shards
+
+
+def _worker(hosts, engine_options, scheduler_options, results, stop):
+    pending = []
+    lock = threading.Lock()
+
+    def on_result(result: ProbeResult):
+        with lock:
+            pending.append((result.host, result.timestamp, result.rtt,
+                            result.packets_sent, result.packets_received, result.error, result.overhead,
+                            result.rtt_min, result.rtt_max, result.jitter, result.rtts))
+
+    engine = ProbeEngine(on_result=on_result, scheduler=ProbeScheduler(**scheduler_options),
+                         bulk=True, **engine_options)
+    engine.start(hosts)
+    try:
+        while not stop.wait(BATCH_INTERVAL):
+            with lock:
+                batch, pending[:] = pending[:], []
+            if batch:
+                results.put(batch)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+
+
+class ProbePool:
+    """
+    Опрос с разделением хостов между процессами.
+
+    Каждый процесс-исполнитель ведет свой ProbeEngine в режиме bulk —
+    со своим планировщиком и своим ICMP-сокетом, — так опрос использует
+    несколько ядер. Хост закрепляется за исполнителем по хэшу имени.
+    Результаты приходят пачками и передаются в on_result из потока
+    чтения, как и у ProbeEngine.
+    """
+
+    def __init__(self, on_result: Callable[[ProbeResult], None], workers: int = None,
+                 concurrency: int = 1000, interval: float = 1.0, timeout: float = 1.0,
+                 privileged: bool = False, max_backoff: float = 60.0,
+                 count: int = 1, burst_interval: float = 0.2):
+        self.on_result = on_result
+        self.workers = workers or multiprocessing.cpu_count()
+        self.concurrency = concurrency
+        self.interval = interval
+        self.timeout = timeout
+        self.privileged = privileged
+        self.max_backoff = max_backoff
+        self.count = count
+        self.burst_interval = burst_interval
+
+        # spawn: дочерний процесс не наследует потоки и состояние Qt
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: List[multiprocessing.Process] = []
+        self._results = None
+        self._stop = None
+        self._reader = None
+
+    @property
+    def running(self) -> bool:
+        return any(process.is_alive() for process in self._processes)
+
+    def start(self, hosts: Iterable[str]):
+        if self._processes:
+            self.stop()
+
+        shards = [[] for _ in range(self.workers)]
+        for host in dict.fromkeys(hosts):
+            shards[shard_of(host, self.workers)].append(host)
+
+        engine_options = {
+            "concurrency": max(1, self.concurrency // self.workers),
+            "timeout": self.timeout,
+            "privileged": self.privileged,
+            "count": self.count,
+            "burst_interval": self.burst_interval,
+        }
+        scheduler_options = {"interval": self.interval, "max_backoff": self.max_backoff}
+
+        self._results = self._context.Queue()
+        self._stop = self._context.Event()
+        for number, shard in enumerate(shards):
+            if not shard:
+                continue
+            process = self._context.Process(
+                target=_worker, name=f"ProbeWorker-{number}", daemon=True,
+                args=(shard, engine_options, scheduler_options, self._results, self._stop)
+            )
+            process.start()
+            self._processes.append(process)
+
+        self._reader = threading.Thread(target=self._read, name="ProbePool", daemon=True)
+        self._reader.start()
+
+    def stop(self, timeout: float = 2.0):
+        if self._stop is not None:
+            self._stop.set()
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        if self._reader is not None:
+            self._reader.join(timeout)
+            self._reader = None
+
+    def _read(self):
+        results, stop = self._results, self._stop
+        while True:
+            try:
+                batch = results.get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set() and not self.running:
+                    return
+                continue
+            for item in batch:
+                result = ProbeResult(*item)
+                try:
+                    self.on_result(result)
+                except Exception as e:
+                    print(f"Ошибка обработки результата {result.host}: {e}", file=sys.stderr)
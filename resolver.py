@@ -0,0 +1,144 @@
+import asyncio
+import socket
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from host_import import is_valid_ip
+
+
+@dataclass
+class CacheEntry:
+    address: Optional[str] = None  # None — имя не разрешилось
+    error: Optional[str] = None
+    expires: float = 0.0  # time.monotonic()
+    refresh_at: float = 0.0
+    last_used: float = 0.0
+
+
+class ResolverCache:
+    """
+    Кэш разрешения имен хостов для движка опроса.
+
+    Разрешение идет в фоне (loop.getaddrinfo в пуле потоков), не больше
+    concurrency запросов одновременно; одно имя разрешается одним запросом.
+    Движок берет из кэша только готовый адрес и никогда не ждет DNS.
+
+    Системный резолвер не сообщает TTL записей, поэтому срок жизни задается
+    настройками: ttl для найденных адресов, negative_ttl для ошибок. После
+    доли refresh_ahead от ttl запись обновляется заранее, а до окончания
+    обновления продолжает использоваться прежний адрес. Записи, к которым
+    не обращались дольше idle_ttl, удаляются.
+
+    Методы вызываются только из цикла событий движка.
+    """
+
+    def __init__(self, ttl: float = 300.0, negative_ttl: float = 30.0,
+                 refresh_ahead: float = 0.8, idle_ttl: float = 3600.0,
+                 concurrency: int = 32, family: int = socket.AF_INET):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.refresh_ahead = refresh_ahead
+        self.idle_ttl = idle_ttl
+        self.concurrency = concurrency
+        self.family = family
+
+        self._entries: Dict[str, CacheEntry] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._semaphore = None
+        self._next_purge = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, host: str):
+        """
+        Адрес из кэша: (адрес, ошибка).
+
+        (адрес, None) — можно опрашивать; (None, ошибка) — имя не разрешилось;
+        (None, None) — разрешение еще идет.
+        """
+        if is_valid_ip(host):
+            return host, None
+
+        now = time.monotonic()
+        entry = self._entries.get(host)
+        if entry is None:
+            self._start(host)
+            return None, None
+
+        entry.last_used = now
+        if now >= entry.refresh_at:
+            self._start(host)
+        if entry.address is not None:
+            # Пока идет обновление, используется прежний адрес
+            return entry.address, None
+        if now >= entry.expires:
+            return None, None
+        return None, entry.error
+
+    def prefetch(self, hosts: Iterable[str]):
+        """Фоновое разрешение имен заранее, до первой проверки"""
+        for host in hosts:
+            if not is_valid_ip(host) and host not in self._entries:
+                self._start(host)
+
+    def forget(self, host: str):
+        self._entries.pop(host, None)
+        task = self._pending.pop(host, None)
+        if task is not None:
+            task.cancel()
+
+    def detach(self):
+        """
+        Отмена фоновых запросов при остановке цикла событий.
+
+        Найденные адреса остаются в кэше и используются при следующем запуске.
+        """
+        tasks = list(self._pending.values())
+        for task in tasks:
+            task.cancel()
+        self._pending.clear()
+        self._semaphore = None
+        return tasks
+
+    def _start(self, host: str):
+        if host in self._pending:
+            return
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        task = asyncio.get_running_loop().create_task(self._resolve(host))
+        self._pending[host] = task
+        task.add_done_callback(lambda _, h=host: self._pending.pop(h, None))
+
+    async def _resolve(self, host: str):
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            try:
+                infos = await loop.getaddrinfo(host, None, family=self.family, type=socket.SOCK_DGRAM)
+                address, error = infos[0][4][0], None
+            except (socket.gaierror, UnicodeError, IndexError) as e:
+                address, error = None, f"Не удалось разрешить имя хоста: {e}"
+
+        now = time.monotonic()
+        entry = self._entries.setdefault(host, CacheEntry(last_used=now))
+        if address is not None:
+            entry.address, entry.error = address, None
+            entry.expires = now + self.ttl
+            entry.refresh_at = now + self.ttl * self.refresh_ahead
+        else:
+            # Временный сбой не затирает ранее найденный адрес, пока тот не устарел
+            if entry.address is not None and now < entry.expires:
+                entry.refresh_at = now + self.negative_ttl
+            else:
+                entry.address, entry.error = None, error
+                entry.expires = entry.refresh_at = now + self.negative_ttl
+
+        if now >= self._next_purge:
+            self._purge(now)
+
+    def _purge(self, now: float):
+        self._next_purge = now + 60
+        idle = [host for host, entry in self._entries.items() if now - entry.last_used > self.idle_ttl]
+        for host in idle:
+            del self._entries[host]
@@ -0,0 +1,207 @@
+import heapq
+import itertools
+import math
+import random
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+
+@dataclass
+class HostOptions:
+    """Индивидуальные настройки опроса хоста"""
+    interval: Optional[float] = None  # None — интервал группы или общий
+    priority: int = 0  # Больше — раньше среди проверок, время которых уже наступило
+    group: Optional[str] = None
+
+
+@dataclass
+class ScheduleEntry:
+    host: str
+    due: float  # Плановое время проверки (time.monotonic)
+    interval: float  # Интервал, с которым запланирована проверка
+    failures: int = 0  # Неудачные проверки подряд
+    generation: int = 0  # Для ленивого удаления из кучи
+
+
+class ProbeScheduler:
+    """
+    Планировщик проверок на двоичной куче.
+
+    Хосты при добавлении равномерно распределяются по интервалу со
+    случайным сдвигом, поэтому запросы не уходят одновременными пачками.
+    После каждой проверки хост перепланируется сам:
+    - живой хост — через свой интервал (хоста, группы или общий);
+    - после backoff_after неудач подряд интервал растет в backoff_factor
+      раз на каждую неудачу, но не больше max_backoff;
+    - первый же ответ сбрасывает счетчик, и хост сразу возвращается
+      к обычному интервалу.
+
+    Время проверки задает только очередность поступления: наступившие
+    проверки переходят во вторую кучу, упорядоченную по приоритету, и
+    pop_due выдает их оттуда. Пока диспетчер успевает, это ничего не
+    меняет; при отставании хосты с большим приоритетом
+    получают место в очереди первыми.
+
+    Время — монотонное (time.monotonic). Класс не потокобезопасен и
+    используется из цикла событий движка опроса.
+    """
+
+    def __init__(self, interval: float = 1.0, jitter: float = 0.1,
+                 backoff_after: int = 3, backoff_factor: float = 2.0,
+                 max_backoff: float = 60.0):
+        self.interval = interval
+        self.jitter = jitter
+        self.backoff_after = backoff_after
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+
+        self._heap = []  # (due, seq, generation, host)
+        self._ready = []  # Наступившие: (-priority, due, seq, generation, host)
+        self._entries: Dict[str, ScheduleEntry] = {}
+        self._options: Dict[str, HostOptions] = {}
+        self._group_intervals: Dict[str, float] = {}
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, host):
+        return host in self._entries
+
+    # --- Настройки ---
+
+    def configure(self, host: str, interval: Optional[float] = None,
+                  priority: Optional[int] = None, group: Optional[str] = None):
+        options = self._options.setdefault(host, HostOptions())
+        if interval is not None:
+            options.interval = interval
+        if priority is not None:
+            options.priority = priority
+        if group is not None:
+            options.group = group
+
+    def set_group_interval(self, group: str, interval: float):
+        self._group_intervals[group] = interval
+
+    def host_options(self) -> Dict[str, HostOptions]:
+        """Копия индивидуальных настроек хостов (для сохранения сеанса)"""
+        return {host: HostOptions(o.interval, o.priority, o.group) for host, o in self._options.items()}
+
+    def group_intervals(self) -> Dict[str, float]:
+        return dict(self._group_intervals)
+
+    def base_interval(self, host: str) -> float:
+        options = self._options.get(host)
+        if options is None:
+            return self.interval
+        if options.interval is not None:
+            return options.interval
+        return self._group_intervals.get(options.group, self.interval)
+
+    # --- Состав ---
+
+    def add_many(self, hosts: Iterable[str], now: float):
+        """Добавление хостов с равномерным распределением первых проверок"""
+        hosts = [host for host in hosts if host not in self._entries]
+        count = len(hosts)
+        for i, host in enumerate(hosts):
+            interval = self.base_interval(host)
+            # Каждый хост попадает в свою долю интервала, внутри доли — случайно
+            due = now + interval * (i + random.random()) / count
+            self._push(ScheduleEntry(host, due, interval))
+
+    def add(self, host: str, now: float):
+        self.add_many([host], now)
+
+    def remove(self, host: str):
+        # Запись в куче удаляется лениво: она будет пропущена при извлечении
+        self._entries.pop(host, None)
+
+    def clear(self):
+        self._heap.clear()
+        self._ready.clear()
+        self._entries.clear()
+
+    # --- Работа ---
+
+    def next_due(self) -> Optional[float]:
+        """Время ближайшей проверки или None, если планировать нечего"""
+        self._drop_stale(self._ready, 3)
+        if self._ready:
+            return self._ready[0][1]
+        self._drop_stale(self._heap, 2)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float, limit: Optional[int] = None) -> List[ScheduleEntry]:
+        """
+        Извлечение хостов, время которых наступило.
+
+        Хосты выдаются по убыванию приоритета, при равном — по времени.
+        Извлеченный хост не планируется повторно до вызова complete().
+        """
+        heap, ready = self._heap, self._ready
+        while heap and heap[0][0] <= now:
+            due, seq, generation, host = heapq.heappop(heap)
+            if self._is_current(host, generation):
+                heapq.heappush(ready, (-self._priority(host), due, seq, generation, host))
+
+        due = []
+        while ready and (limit is None or len(due) < limit):
+            *_, generation, host = heapq.heappop(ready)
+            if self._is_current(host, generation):
+                due.append(self._entries[host])
+        return due
+
+    def complete(self, host: str, alive: bool, now: float):
+        """Перепланирование хоста по результату проверки"""
+        entry = self._entries.get(host)
+        if entry is None:
+            return  # Хост удален, пока шла проверка
+
+        interval = self.base_interval(host)
+        if alive:
+            entry.failures = 0
+        else:
+            entry.failures += 1
+            if entry.failures >= self.backoff_after:
+                steps = entry.failures - self.backoff_after + 1
+                interval = self._backoff(interval, steps)
+
+        interval *= 1 + random.uniform(-self.jitter, self.jitter)
+        # Отсчет от планового времени, чтобы интервал не «уплывал» на время проверки
+        entry.due = max(entry.due + interval, now)
+        entry.interval = interval
+        self._push(entry)
+
+    def postpone(self, host: str, delay: float, now: float):
+        """Повтор через delay без учета как неудачной проверки"""
+        entry = self._entries.get(host)
+        if entry is not None:
+            entry.due = now + delay
+            self._push(entry)
+
+    def _backoff(self, interval: float, steps: int) -> float:
+        limit = max(self.max_backoff, interval)
+        if interval <= 0 or self.backoff_factor <= 1:
+            return interval
+        # Степень ограничивается до возведения: после тысячи неудач подряд
+        # backoff_factor ** steps переполнил бы float
+        steps = min(steps, math.ceil(math.log(limit / interval, self.backoff_factor)))
+        return min(interval * self.backoff_factor ** steps, limit)
+
+    def _priority(self, host: str) -> int:
+        options = self._options.get(host)
+        return options.priority if options else 0
+
+    def _push(self, entry: ScheduleEntry):
+        entry.generation += 1
+        self._entries[entry.host] = entry
+        heapq.heappush(self._heap, (entry.due, next(self._seq), entry.generation, entry.host))
+
+    def _is_current(self, host: str, generation: int) -> bool:
+        entry = self._entries.get(host)
+        return entry is not None and entry.generation == generation
+
+    def _drop_stale(self, heap, generation_index: int):
+        while heap and not self._is_current(heap[0][-1], heap[0][generation_index]):
+            heapq.heappop(heap)
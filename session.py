@@ -0,0 +1,130 @@
+"""
+Двоичный снимок сеанса для быстрого запуска.
+
+При выходе сохраняются хосты в порядке строк, последние метрики,
+настройки опроса (интервалы, приоритеты, группы) и раскладка столбцов;
+при запуске файл отображается в память (mmap), и массивы метрик
+читаются из него без разбора и копирования построчно.
+
+Формат, все числа little-endian:
+
+    заголовок   "HSES", версия u32, число хостов u64
+    оглавление  для каждого раздела из SECTIONS: смещение u64, длина u64
+    разделы     hosts — имена UTF-8 через "\\n";
+                rtt, delivered, loss, last_seen — f8 по хостам;
+                options — JSON {"hosts": {хост: [интервал, приоритет, группа]},
+                "groups": {группа: интервал}, "view": {"sparkline": bool}};
+                header — состояние заголовка таблицы (QHeaderView.saveState)
+
+Модуль не зависит от Qt.
+"""
+import json
+import mmap
+import os
+import struct
+from typing import Dict, List, Optional
+
+import numpy as np
+
+SESSION_MAGIC = b"HSES"
+SESSION_VERSION = 1
+SECTIONS = ("hosts", "rtt", "delivered", "loss", "last_seen", "options", "header")
+METRIC_SECTIONS = ("rtt", "delivered", "loss", "last_seen")
+_HEADER = struct.Struct("<4sIQ")
+_SECTION = struct.Struct("<QQ")
+
+
+class Session:
+    """Прочитанный снимок; массивы метрик ссылаются на отображенный файл до close()"""
+
+    def __init__(self, hosts: List[str], columns: Dict[str, np.ndarray], options: dict,
+                 header: bytes, mapping: Optional[mmap.mmap] = None):
+        self.hosts = hosts
+        self.columns = columns
+        self.options = options
+        self.header = header
+        self._mapping = mapping
+
+    def close(self):
+        # Массивы numpy держат буфер mmap, их нужно отпустить до закрытия
+        self.columns = {}
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+
+def save_session(file_name: str, hosts: List[str], columns: Dict[str, np.ndarray],
+                 options: Optional[dict] = None, header: bytes = b""):
+    """
+    Запись снимка; columns — массивы METRIC_SECTIONS в порядке hosts.
+
+    Файл пишется во временный и подменяется целиком, поэтому сбой при
+    записи не портит предыдущий снимок.
+    """
+    payloads = {
+        "hosts": "\n".join(hosts).encode(),
+        "options": json.dumps(options or {}, ensure_ascii=False).encode(),
+        "header": bytes(header),
+    }
+    for name in METRIC_SECTIONS:
+        payloads[name] = np.ascontiguousarray(columns[name], dtype="<f8").tobytes()
+
+    offset = _HEADER.size + _SECTION.size * len(SECTIONS)
+    table = []
+    for name in SECTIONS:
+        # Числовые разделы выравниваются на 8 байт для np.frombuffer
+        offset = (offset + 7) & ~7
+        table.append((offset, len(payloads[name])))
+        offset += len(payloads[name])
+
+    tmp_name = file_name + ".tmp"
+    with open(tmp_name, "wb") as f:
+        f.write(_HEADER.pack(SESSION_MAGIC, SESSION_VERSION, len(hosts)))
+        for entry in table:
+            f.write(_SECTION.pack(*entry))
+        for name, (start, _) in zip(SECTIONS, table):
+            f.write(b"\0" * (start - f.tell()))
+            f.write(payloads[name])
+    os.replace(tmp_name, file_name)
+
+
+def load_session(file_name: str) -> Optional[Session]:
+    """Чтение снимка; None, если файла нет или он не подходит"""
+    try:
+        with open(file_name, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None  # Нет файла или он пустой
+
+    try:
+        magic, version, count = _HEADER.unpack_from(mapping, 0)
+        if magic != SESSION_MAGIC or version != SESSION_VERSION:
+            raise ValueError(f"{file_name}: не снимок сеанса версии {SESSION_VERSION}")
+        sections = {}
+        for number, name in enumerate(SECTIONS):
+            start, size = _SECTION.unpack_from(mapping, _HEADER.size + _SECTION.size * number)
+            if start + size > len(mapping):
+                raise ValueError(f"{file_name}: файл обрезан")
+            sections[name] = (start, size)
+
+        if any(sections[name][1] != count * 8 for name in METRIC_SECTIONS):
+            raise ValueError(f"{file_name}: размер метрик не совпадает с числом хостов")
+
+        start, size = sections["hosts"]
+        hosts = mapping[start:start + size].decode().split("\n") if count else []
+        if len(hosts) != count:
+            raise ValueError(f"{file_name}: число хостов не совпадает с заголовком")
+        start, size = sections["options"]
+        options = json.loads(mapping[start:start + size].decode() or "{}")
+        start, size = sections["header"]
+        header = mapping[start:start + size]
+    except (ValueError, struct.error, UnicodeDecodeError):
+        mapping.close()
+        return None
+
+    # Массивы создаются после всех проверок: mmap с живыми массивами закрыть нельзя
+    columns = {
+        name: np.frombuffer(mapping, dtype="<f8", count=count, offset=sections[name][0])
+        for name in METRIC_SECTIONS
+    }
+    return Session(hosts, columns, options, header, mapping)
@@ -0,0 +1,134 @@
+"""
+Столбец с графиком RTT и потерь хоста за последний час.
+
+История берется из минутных корзин HostStats: у каждой минуты есть
+минимум и максимум RTT и доля потерь. Минута рисуется вертикальным
+отрезком от минимума до максимума, поэтому кратковременные всплески не
+теряются; если ячейка уже числа минут, соседние минуты объединяются
+(минимум минимумов, максимум максимумов). Готовые линии кэшируются по
+слоту, размеру ячейки и версии истории и пересчитываются только после
+прихода новых пакетов или смены минуты. Представление вызывает paint()
+только для видимых ячеек.
+"""
+from collections import OrderedDict
+
+import numpy as np
+from PyQt6.QtCore import QLineF, QPointF
+from PyQt6.QtGui import QPainter, QPen, QPolygonF
+from PyQt6.QtWidgets import QStyledItemDelegate
+
+from host_model import COLOR_ALIVE, COLOR_DEAD
+
+# Отступ графика от границ ячейки, пиксели
+MARGIN = 2
+# Доля высоты ячейки под отметки потерь
+LOSS_HEIGHT = 0.3
+
+
+def minmax_buckets(low: np.ndarray, high: np.ndarray, lost: np.ndarray, width: int):
+    """
+    Сжатие ряда корзин (минимумы, максимумы, доля потерь) до width корзин.
+
+    NaN в минимуме и максимуме — в корзине нет ответов. Если корзин не
+    больше width, ряд возвращается как есть.
+    """
+    low = np.asarray(low, dtype=np.float32)
+    high = np.asarray(high, dtype=np.float32)
+    lost = np.asarray(lost, dtype=np.float32)
+    count = len(low)
+    if not count or width <= 0:
+        empty = np.empty(0, dtype=np.float32)
+        return empty, empty, empty
+    if count <= width:
+        return low, high, lost
+
+    starts = np.arange(width) * count // width
+    sizes = np.diff(np.append(starts, count))
+    return (
+        np.fmin.reduceat(low, starts),
+        np.fmax.reduceat(high, starts),
+        (np.add.reduceat(lost, starts) / sizes).astype(np.float32),
+    )
+
+
+class SparklineDelegate(QStyledItemDelegate):
+    """
+    Отрисовка истории RTT в ячейке.
+
+    Модель должна предоставлять sparkline_key(row) → (слот, версия) и
+    sparkline_values(slot) → (минимумы, максимумы, доля потерь) по
+    корзинам в хронологическом порядке.
+    """
+
+    def __init__(self, parent=None, cache_size: int = 4096):
+        super().__init__(parent)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # (слот, ширина, высота) → (версия, отрезки RTT, отметки потерь)
+
+    def paint(self, painter, option, index):
+        # Фон и выделение рисует стандартный делегат, текста в ячейке нет
+        super().paint(painter, option, index)
+
+        rect = option.rect.adjusted(MARGIN, MARGIN, -MARGIN, -MARGIN)
+        if rect.width() <= 0 or rect.height() <= 0:
+            return
+        model = index.model()
+        slot, version = model.sparkline_key(index.row())
+        key = (slot, rect.width(), rect.height())
+
+        entry = self._cache.get(key)
+        if entry is None or entry[0] != version:
+            entry = (version, *self._build(*model.sparkline_values(slot), rect.width(), rect.height()))
+            self._cache[key] = entry
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        _, polylines, loss_lines = entry
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+        painter.translate(rect.topLeft())
+        painter.setPen(QPen(COLOR_ALIVE, 1))
+        for polyline in polylines:
+            painter.drawPolyline(polyline)
+        if loss_lines:
+            painter.setPen(QPen(COLOR_DEAD, 1))
+            painter.drawLines(loss_lines)
+        painter.restore()
+
+    def invalidate(self):
+        self._cache.clear()
+
+    @staticmethod
+    def _build(low, high, lost, width, height):
+        """Отрезки в координатах ячейки: ломаные RTT (разрываются на минутах без ответов) и отметки потерь"""
+        low, high, lost = minmax_buckets(low, high, lost, width)
+        if not len(low):
+            return [], []
+
+        # Шкала от нуля до максимума хоста, чтобы рост задержки был виден
+        peak = np.nanmax(high) if not np.isnan(high).all() else 0.0
+        scale = (height - 1) / peak if peak > 0 else 0.0
+        step = width / len(low)
+        xs = (np.arange(len(low)) + 0.5) * step
+        y_low = (height - 1) - low * scale
+        y_high = (height - 1) - high * scale
+
+        polylines, points = [], []
+        for x, y1, y2 in zip(xs.tolist(), y_low.tolist(), y_high.tolist()):
+            if y1 != y1:  # NaN — в корзине нет ответов
+                if points:
+                    polylines.append(QPolygonF(points))
+                    points = []
+                continue
+            points.append(QPointF(x, y1))
+            points.append(QPointF(x, y2))
+        if points:
+            polylines.append(QPolygonF(points))
+
+        loss_lines = [
+            QLineF(x, height, x, height - max(2.0, share * height * LOSS_HEIGHT))
+            for x, share in zip(xs.tolist(), lost.tolist()) if share > 0
+        ]
+        return polylines, loss_lines
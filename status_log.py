@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import List, Optional, Tuple
+
+# Уровни важности сообщений
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {
+    DEBUG: "отладка",
+    INFO: "инфо",
+    WARNING: "внимание",
+    ERROR: "ошибка",
+}
+
+
+@dataclass
+class LogEntry:
+    timestamp: float
+    level: int
+    message: str
+    host: Optional[str] = None
+    count: int = 1  # Сколько раз повторилось сообщение
+    last_timestamp: float = field(default=0.0)
+    number: int = 0  # Порядковый номер добавления в журнал
+    revision: int = 0  # Значение StatusLog.revision при последнем изменении
+
+    def format(self) -> str:
+        line = f"[{time.strftime('%H:%M:%S', time.localtime(self.timestamp))}] " \
+               f"[{LEVEL_NAMES.get(self.level, self.level)}] "
+        if self.host:
+            line += f"{self.host}: "
+        # Одна запись — одна строка: представление заменяет строки по номеру записи
+        line += self.message.replace("\n", " ")
+        if self.count > 1:
+            last = time.strftime('%H:%M:%S', time.localtime(self.last_timestamp))
+            line += f" ×{self.count} (последнее в {last})"
+        return line
+
+
+class StatusLog:
+    """
+    Журнал статуса с ограниченной емкостью.
+
+    Хранит не более capacity записей в кольцевом буфере. Сообщения ниже
+    текущего уровня отбрасываются сразу. Одинаковые сообщения по одному
+    хосту не добавляются заново, а увеличивают счетчик существующей записи,
+    пока она остается в буфере. Запись возможна из любого потока.
+    """
+
+    def __init__(self, capacity: int = 2000, level: int = INFO):
+        self.capacity = capacity
+        self.level = level
+
+        self._entries = deque(maxlen=capacity)
+        self._aggregated = {}  # (хост, сообщение) → LogEntry
+        self._lock = threading.Lock()
+
+        # Счетчики для инкрементальной отрисовки
+        self.appended = 0  # Всего добавлено записей
+        self.revision = 0  # Изменения уже существующих записей
+        self.cleared = 0  # Очистки журнала
+        self._updated = {}  # номер записи → запись, в порядке последнего изменения
+
+    def enabled_for(self, level: int) -> bool:
+        return level >= self.level
+
+    def log(self, level: int, message: str, host: Optional[str] = None):
+        if level < self.level:
+            return
+
+        now = time.time()
+        with self._lock:
+            key = (host, message) if host else None
+            entry = self._aggregated.get(key) if key else None
+            if entry is not None:
+                entry.count += 1
+                entry.last_timestamp = now
+                self.revision += 1
+                entry.revision = self.revision
+                self._updated.pop(entry.number, None)
+                self._updated[entry.number] = entry
+                return
+
+            if len(self._entries) == self.capacity:
+                self._forget(self._entries[0])
+
+            entry = LogEntry(now, level, message, host, last_timestamp=now, number=self.appended)
+            self._entries.append(entry)
+            if key:
+                self._aggregated[key] = entry
+            self.appended += 1
+
+    def debug(self, message: str, host: Optional[str] = None):
+        self.log(DEBUG, message, host)
+
+    def info(self, message: str, host: Optional[str] = None):
+        self.log(INFO, message, host)
+
+    def warning(self, message: str, host: Optional[str] = None):
+        self.log(WARNING, message, host)
+
+    def error(self, message: str, host: Optional[str] = None):
+        self.log(ERROR, message, host)
+
+    def snapshot(self) -> Tuple[List[str], int, int]:
+        """Строки всех записей и текущие счетчики (appended, revision)"""
+        with self._lock:
+            return [entry.format() for entry in self._entries], self.appended, self.revision
+
+    def changes_since(self, appended: int, revision: int) -> Tuple[List[str], List[Tuple[int, str]], int, int]:
+        """
+        Изменения после указанных значений счетчиков: строки новых записей,
+        [(номер записи, строка)] для ранее добавленных записей с новым
+        счетчиком повторов и текущие счетчики (appended, revision).
+        """
+        with self._lock:
+            new = min(self.appended - appended, len(self._entries))
+            entries = islice(self._entries, len(self._entries) - new, None) if new > 0 else ()
+            lines = [entry.format() for entry in entries]
+
+            # Обход от последних изменений до первого уже известного
+            updated = []
+            for entry in reversed(self._updated.values()):
+                if entry.revision <= revision:
+                    break
+                if entry.number < appended:  # Новые записи и так придут целиком
+                    updated.append((entry.number, entry.format()))
+            return lines, updated, self.appended, self.revision
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._aggregated.clear()
+            self._updated.clear()
+            self.revision += 1
+            self.cleared += 1
+
+    def _forget(self, entry: LogEntry):
+        self._updated.pop(entry.number, None)
+        key = (entry.host, entry.message)
+        if entry.host and self._aggregated.get(key) is entry:
+            del self._aggregated[key]
@@ -0,0 +1,53 @@
+import unittest
+
+from scheduler import ProbeScheduler
+
+
+class BackoffTest(unittest.TestCase):
+    def test_long_failure_streak_stays_at_max_backoff(self):
+        scheduler = ProbeScheduler(interval=1.0, jitter=0.0, max_backoff=60.0)
+        scheduler.add("10.0.0.1", now=0.0)
+        now = 0.0
+        for _ in range(5000):
+            (entry,) = scheduler.pop_due(float("inf"))
+            now = entry.due
+            scheduler.complete(entry.host, False, now)
+        self.assertEqual(entry.interval, 60.0)
+
+    def test_first_reply_resets_interval(self):
+        scheduler = ProbeScheduler(interval=1.0, jitter=0.0)
+        scheduler.add("10.0.0.1", now=0.0)
+        for _ in range(10):
+            (entry,) = scheduler.pop_due(float("inf"))
+            scheduler.complete(entry.host, False, entry.due)
+        (entry,) = scheduler.pop_due(float("inf"))
+        scheduler.complete(entry.host, True, entry.due)
+        self.assertEqual(entry.interval, 1.0)
+
+
+class PriorityTest(unittest.TestCase):
+    def test_due_hosts_are_returned_by_priority(self):
+        scheduler = ProbeScheduler(interval=1.0)
+        hosts = [f"10.0.0.{i}" for i in range(100)]
+        scheduler.configure("10.0.0.99", priority=10)
+        scheduler.add_many(hosts, now=0.0)
+
+        # Отставание: время всех хостов наступило, а за раз забирается один
+        first = scheduler.pop_due(now=5.0, limit=1)
+        self.assertEqual([entry.host for entry in first], ["10.0.0.99"])
+
+        rest = scheduler.pop_due(now=5.0)
+        dues = [entry.due for entry in rest]
+        self.assertEqual(dues, sorted(dues))
+        self.assertEqual(len(rest), 99)
+
+    def test_removed_host_is_skipped(self):
+        scheduler = ProbeScheduler(interval=1.0)
+        scheduler.add_many(["a", "b"], now=0.0)
+        scheduler.remove("a")
+        self.assertEqual([entry.host for entry in scheduler.pop_due(now=5.0)], ["b"])
+        self.assertIsNone(scheduler.next_due())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,210 @@
+"""
+Встроенная трассировка пути результата: проверка → очередь → таблица → отрисовка.
+
+Трассировка включается явно (TRACER.enable()); пока она выключена, точки
+записи сводятся к проверке одного флага. События хранятся в кольцевом
+буфере фиксированного размера: старые вытесняются новыми, поэтому ее
+можно держать включенной в рабочем сеансе. Снимок буфера сохраняется в
+формате Chrome Trace Event (JSON), который открывают chrome://tracing и
+ui.perfetto.dev.
+
+Виды событий:
+- span — интервал в одном потоке (вложенные интервалы показываются
+  стопкой);
+- begin_async/end_async — интервал, который пересекает await или потоки
+  (например, проверка хоста), рисуется на отдельной дорожке;
+- flow_start/flow_end — стрелка от интервала в одном потоке к интервалу
+  в другом (пачка результатов от движка до GUI-потока).
+
+Модуль не зависит от Qt.
+"""
+import collections
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+# Событий в буфере по умолчанию (порядка 20 МБ)
+DEFAULT_CAPACITY = 100_000
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.complete(self.name, self.start, cat=self.cat, args=self.args)
+        return False
+
+
+class Tracer:
+    """
+    Кольцевой буфер событий трассировки.
+
+    Запись потокобезопасна без блокировок: deque.append атомарен. Время —
+    time.perf_counter_ns, общее для всех потоков процесса.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.enabled = False
+        self._events = collections.deque(maxlen=capacity)
+        self._threads = {}  # идентификатор потока → имя
+        self._ids = itertools.count(1)
+
+    @property
+    def capacity(self) -> int:
+        return self._events.maxlen
+
+    def __len__(self):
+        return len(self._events)
+
+    def enable(self, capacity: Optional[int] = None):
+        if capacity is not None and capacity != self._events.maxlen:
+            self._events = collections.deque(self._events, maxlen=capacity)
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        self._events.clear()
+
+    # --- Запись ---
+
+    def span(self, name: str, cat: str = "", **args):
+        """Контекстный менеджер интервала в текущем потоке"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat, args or None)
+
+    def complete(self, name: str, start: int, end: Optional[int] = None, cat: str = "", args=None):
+        """Интервал [start, end) по time.perf_counter_ns; end по умолчанию — сейчас"""
+        if not self.enabled:
+            return
+        end = time.perf_counter_ns() if end is None else end
+        self._events.append(("X", name, cat, start, end - start, self._thread(), None, args))
+
+    def instant(self, name: str, cat: str = "", **args):
+        if self.enabled:
+            self._events.append(("i", name, cat, time.perf_counter_ns(), 0, self._thread(), None, args or None))
+
+    def begin_async(self, name: str, cat: str = "", **args) -> int:
+        """Начало интервала на отдельной дорожке; возвращает номер для end_async (0 — не записан)"""
+        if not self.enabled:
+            return 0
+        event_id = next(self._ids)
+        self._events.append(("b", name, cat, time.perf_counter_ns(), 0, self._thread(), event_id, args or None))
+        return event_id
+
+    def end_async(self, name: str, event_id: int, cat: str = "", **args):
+        if event_id:
+            self._events.append(("e", name, cat, time.perf_counter_ns(), 0, self._thread(), event_id, args or None))
+
+    def flow_start(self, name: str, cat: str = "") -> int:
+        """Начало стрелки из текущего интервала; возвращает номер для flow_end (0 — не записана)"""
+        if not self.enabled:
+            return 0
+        event_id = next(self._ids)
+        self._events.append(("s", name, cat, time.perf_counter_ns(), 0, self._thread(), event_id, None))
+        return event_id
+
+    def flow_end(self, name: str, event_id: int, cat: str = ""):
+        """Конец стрелки в текущем интервале"""
+        if event_id:
+            self._events.append(("f", name, cat, time.perf_counter_ns(), 0, self._thread(), event_id, None))
+
+    def _thread(self) -> int:
+        ident = threading.get_ident()
+        if ident not in self._threads:
+            self._threads[ident] = threading.current_thread().name
+        return ident
+
+    # --- Сохранение ---
+
+    def snapshot(self) -> "TraceSnapshot":
+        """Копия буфера; сохранять ее можно в другом потоке"""
+        return TraceSnapshot(list(self._events), dict(self._threads))
+
+    def save(self, file_name: str) -> int:
+        return self.snapshot().save(file_name)
+
+
+class TraceSnapshot:
+    def __init__(self, events, threads):
+        self.events = events
+        self.threads = threads
+
+    def __len__(self):
+        return len(self.events)
+
+    def save(self, file_name: str, on_progress=None, is_cancelled=lambda: False) -> int:
+        """Запись в формате Chrome Trace Event; возвращает число событий"""
+        pid = os.getpid()
+        total = len(self.events)
+        origin = min((event[3] for event in self.events), default=0)
+        with open(file_name, "w", encoding="utf-8") as f:
+            f.write('{"displayTimeUnit":"ms","traceEvents":[\n')
+            records = [
+                {"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": name}}
+                for tid, name in self.threads.items()
+            ]
+            for number, event in enumerate(self.events, 1):
+                records.append(_chrome_event(event, pid, origin))
+                if len(records) >= 10000 or number == total:
+                    if is_cancelled():
+                        return number
+                    f.write(",\n".join(json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+                                       for record in records))
+                    f.write(",\n" if number < total else "\n")
+                    records = []
+                    if on_progress is not None:
+                        on_progress(number, total)
+            if records:
+                # Буфер пуст: только имена потоков
+                f.write(",\n".join(json.dumps(record, ensure_ascii=False) for record in records) + "\n")
+            f.write("]}\n")
+        return total
+
+
+def _chrome_event(event, pid, origin):
+    phase, name, cat, start, duration, tid, event_id, args = event
+    record = {"ph": phase, "name": name, "cat": cat or "app", "pid": pid, "tid": tid,
+              "ts": (start - origin) / 1000}
+    if phase == "X":
+        record["dur"] = duration / 1000
+    elif phase == "i":
+        record["s"] = "t"
+    elif phase == "f":
+        record["bp"] = "e"  # Стрелка входит в интервал, внутри которого записан конец
+    if event_id is not None:
+        record["id"] = event_id
+    if args:
+        record["args"] = args
+    return record
+
+
+TRACER = Tracer()